@@ -0,0 +1,100 @@
+# api_cache.py ────────────────────────────────────────────────────
+"""
+Regroupement des requêtes + cache court des réponses de l'API.
+─ single-flight : N requêtes identiques simultanées ⇒ 1 seul appel
+  Odoo / OPC UA, dont le résultat est partagé
+─ cache TTL par route (config.API_CACHE_TTL), invalidé explicitement
+  quand un OF est lancé ; taille bornée (config.API_CACHE_SIZE) : les
+  clés viennent des paramètres de requête, donc en nombre illimité
+
+    orders, etag = cached("orders", (), oc.list_orders_etag)
+    invalidate("orders")
+"""
+
+from __future__ import annotations
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+from config import API_CACHE_TTL, API_CACHE_SIZE
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+        if not leader:
+            return fut.result()              # résultat (ou exception) du premier appelant
+        try:
+            result = fn()
+            fut.set_result(result)
+            return result
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class TTLCache:
+    def __init__(self, max_size: int = API_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._data: dict[tuple, tuple[float, Any]] = {}   # (route, clé) -> (expiration, valeur)
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> tuple[bool, Any]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and hit[0] < time.monotonic():
+                del self._data[key]
+                hit = None
+        if hit is None:
+            return False, None
+        return True, hit[1]
+
+    def set(self, key: tuple, value: Any, ttl: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data.pop(key, None)                     # ordre du dict = ordre d'insertion
+            self._data[key] = (now + ttl, value)
+            if len(self._data) > self.max_size:
+                for k in [k for k, (exp, _) in self._data.items() if exp < now]:
+                    del self._data[k]
+            while len(self._data) > self.max_size:        # puis les plus anciennes
+                del self._data[next(iter(self._data))]
+
+    def invalidate(self, route: str) -> None:
+        with self._lock:
+            for key in [k for k in self._data if k[0] == route]:
+                del self._data[key]
+
+
+_flight = SingleFlight()
+_cache = TTLCache()
+
+
+def cached(route: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+    """Valeur en cache si fraîche, sinon appel unique partagé puis mise en cache."""
+    full = (route, key)
+    hit, value = _cache.get(full)
+    if hit:
+        return value
+    value = _flight.do(full, fn)
+    ttl = API_CACHE_TTL.get(route, 0)
+    if ttl > 0:
+        _cache.set(full, value, ttl)
+    return value
+
+
+def invalidate(*routes: str) -> None:
+    for route in routes:
+        _cache.invalidate(route)
@@ -1,13 +1,33 @@
 # app.py ──────────────────────────────────────────────────────────
 import os
-from flask import Flask
+import time
+from flask import Flask, g, request
 from dotenv import load_dotenv
 from routes import api_routes            # <- blueprint REST
+from status_poller import poller         # <- état des îlots en tâche de fond
+from historian import historian          # <- historique des tags automates
+from metrics import HTTP_SECONDS
 
 def create_app() -> Flask:
     load_dotenv()                        # charge .env si présent
     app = Flask(__name__)
     app.register_blueprint(api_routes, url_prefix="/api")
+
+    # latence de chaque route (exposée sur /api/metrics)
+    @app.before_request
+    def _start_timer():
+        g.t0 = time.perf_counter()
+
+    @app.after_request
+    def _observe(resp):
+        if "t0" in g:
+            rule = request.url_rule.rule if request.url_rule else "<inconnue>"
+            HTTP_SECONDS.observe(time.perf_counter() - g.t0, route=rule,
+                                 method=request.method, status=resp.status_code)
+        return resp
+
+    poller.start()
+    historian.start()
     return app
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+# bench.py ────────────────────────────────────────────────────────
+"""
+Bench du chemin liste OF / dispatch / statut contre les simulateurs
+(sim_odoo + sim_opcua) : aucun automate ni serveur Odoo nécessaire.
+─ latence p50 / p95 / p99 (ms) et débit (op/s) par scénario
+─ --out FICHIER : ajoute une ligne JSON (révision git, paramètres, résultats)
+  pour comparer les versions entre elles
+
+    python3 bench.py -n 200 -c 4 --orders 2000 --odoo-latency 0.02 --plc-latency 0.005
+"""
+
+from __future__ import annotations
+import argparse
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sim_odoo import FakeOdoo, serve
+from sim_opcua import SimPLC
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "?"
+
+
+def run(name: str, fn, n: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+
+    def one(_):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            ok = fn()
+        except Exception:
+            ok = False
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if not ok:
+            errors += 1
+
+    fn()                                   # échauffement (sessions, caches)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(one, range(n)))
+    wall = time.perf_counter() - t0
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {"scenario": name, "n": n, "concurrency": concurrency, "errors": errors,
+            "p50_ms": round(q[49], 2), "p95_ms": round(q[94], 2), "p99_ms": round(q[98], 2),
+            "throughput": round(n / wall, 1)}
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("-n", type=int, default=100, help="itérations par scénario")
+    p.add_argument("-c", "--concurrency", type=int, default=1)
+    p.add_argument("--orders", type=int, default=500, help="OF simulés dans Odoo")
+    p.add_argument("--odoo-latency", type=float, default=0.0)
+    p.add_argument("--plc-latency", type=float, default=0.0)
+    p.add_argument("--fail-rate", type=float, default=0.0)
+    p.add_argument("--churn", type=int, default=0, help="OF modifiés par seconde")
+    p.add_argument("--scenarios", default="", help="liste séparée par des virgules")
+    p.add_argument("--out", help="fichier JSONL de résultats")
+    a = p.parse_args()
+
+    # 1) simulateurs, AVANT d'importer le projet (endpoints lus à l'import)
+    odoo = FakeOdoo(orders=a.orders, latency=a.odoo_latency)
+    server, url = serve(odoo)
+    os.environ["ODOO_URL"] = url
+    plcs = []
+    for i in (1, 2, 3):
+        plc = SimPLC(_free_port(), a.plc_latency, a.fail_rate, f"LGN0{i}").start()
+        os.environ[f"OPCUA_LGN0{i}"] = plc.url
+        plcs.append(plc)
+    os.environ.setdefault("TRACE_DB", os.path.join(tempfile.mkdtemp(), "bench_trace.db"))
+
+    stop = threading.Event()
+    if a.churn:
+        def churn():
+            while not stop.wait(1):
+                odoo.touch(a.churn)
+        threading.Thread(target=churn, daemon=True).start()
+
+    import odoo_client
+    import opcua_client
+
+    ilots = list(opcua_client.OPCUA_ENDPOINTS)
+    qty = itertools.count(1)
+    scenarios = {
+        "list_orders":   lambda: odoo_client.list_orders() is not None,
+        "search_orders": lambda: odoo_client.search_orders(state=["confirmed", "progress"],
+                                                           limit=50) is not None,
+        "components":    lambda: bool(odoo_client.list_components_batch(
+                                      [f"WH/MO/{i:05d}" for i in range(1, 21)])),
+        # quantité différente à chaque envoi : sinon l'image automate
+        # (écritures redondantes sautées) mesurerait un envoi vide
+        "dispatch":      lambda: opcua_client.send_order_details(
+                                      "LGN01", "WH/MO/00017", "Assemblage (27)", next(qty)),
+        "dispatch_x3":   lambda: all(r["ok"] for r in opcua_client.dispatch_order(
+                                      ilots, "WH/MO/00017", "Assemblage (27)", next(qty),
+                                      validate=False).values()),
+        "status":        lambda: all(v != "OFF" for v in opcua_client.get_states().values()),
+    }
+    chosen = [s for s in a.scenarios.split(",") if s] or list(scenarios)
+
+    results = []
+    try:
+        for name in chosen:
+            res = run(name, scenarios[name], a.n, a.concurrency)
+            results.append(res)
+            print(f"{name:<14} p50 {res['p50_ms']:>8.2f} ms   p95 {res['p95_ms']:>8.2f} ms   "
+                  f"p99 {res['p99_ms']:>8.2f} ms   {res['throughput']:>8.1f} op/s   "
+                  f"erreurs {res['errors']}")
+        print(f"appels Odoo simulés : {odoo.calls}")
+    finally:
+        stop.set()
+        opcua_client._pool.close_all()
+        for plc in plcs:
+            plc.stop()
+        server.shutdown()
+
+    if a.out:
+        with open(a.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"rev": _git_rev(), "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                                "params": vars(a), "results": results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,3 +15,18 @@ OPCUA_ENDPOINT = {
     "LGN02": "opc.tcp://172.30.30.130:4840",
     "LGN03": "opc.tcp://172.30.30.140:4840",
 }
+
+# rafraîchissement de l'état des îlots en tâche de fond (s, 0 = désactivé)
+STATUS_POLL_INTERVAL = float(os.getenv("STATUS_POLL_INTERVAL", "5"))
+# abonnement OPC UA à NODE_STATE_MACHINE (mise à jour immédiate de l'instantané)
+OPCUA_SUBSCRIBE = os.getenv("OPCUA_SUBSCRIBE", "1") == "1"
+
+# cache des réponses de l'API (s, 0 = pas de cache ; les appels simultanés
+# identiques sont de toute façon regroupés en un seul appel backend)
+API_CACHE_TTL = {
+    "orders":     float(os.getenv("API_TTL_ORDERS", "2")),
+    "search":     float(os.getenv("API_TTL_SEARCH", "5")),
+    "components": float(os.getenv("API_TTL_COMPONENTS", "10")),
+    "status":     float(os.getenv("API_TTL_STATUS", "1")),
+}
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "256"))   # réponses mémorisées max
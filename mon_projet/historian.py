@@ -0,0 +1,186 @@
+# historian.py ────────────────────────────────────────────────────
+"""
+Historique compact des tags automates (état machine, OF, quantité…).
+─ une série par (îlot, tag) : deux colonnes `array('d')` (horodatage, valeur)
+  de taille fixe utilisées en tampon circulaire ⇒ mémoire bornée et connue
+─ HISTORIAN_DIR : colonnes projetées dans des fichiers (mmap) ⇒ survivent
+  au redémarrage et ne pèsent pas sur la RAM du Raspberry Pi
+─ échantillonnage périodique (une lecture groupée par îlot) + changements
+  reçus par abonnement OPC UA quand ils sont disponibles
+─ downsample() : min / max / dernière valeur par intervalle pour /api/history
+"""
+
+from __future__ import annotations
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from concurrent.futures import Future
+from pathlib import Path
+
+from opcua_client import (
+    OPCUA_ENDPOINTS, bus, workers, with_plc, DataChange,
+    NODE_STATE_MACHINE, NODE_START_ORDER, NODE_ORDER_CODE, NODE_ORDER_QTY,
+)
+
+HISTORIAN_PERIOD   = float(os.getenv("HISTORIAN_PERIOD", "1"))         # s, 0 = désactivé
+HISTORIAN_CAPACITY = int(os.getenv("HISTORIAN_CAPACITY", "28800"))     # points / série (8 h à 1 s)
+HISTORIAN_DIR      = os.getenv("HISTORIAN_DIR", "")                    # "" = mémoire seule
+
+# tags historisés : nom court → NodeId (sélection via HISTORIAN_TAGS="state,qty")
+TAGS = {
+    "state": NODE_STATE_MACHINE,
+    "of":    NODE_START_ORDER,
+    "code":  NODE_ORDER_CODE,
+    "qty":   NODE_ORDER_QTY,
+}
+_selected = os.getenv("HISTORIAN_TAGS", "")
+if _selected:
+    TAGS = {k: v for k, v in TAGS.items() if k in _selected.split(",")}
+
+_HEADER = struct.Struct("<qq")       # tête d'écriture, nombre de points
+
+
+class RingSeries:
+    """Série (horodatage, valeur) de capacité fixe, ordonnée dans le temps."""
+
+    def __init__(self, capacity: int = HISTORIAN_CAPACITY, path: str | None = None) -> None:
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        if path:
+            size = _HEADER.size + 16 * capacity
+            with open(path, "a+b") as f:
+                if os.fstat(f.fileno()).st_size != size:
+                    f.truncate(0); f.truncate(size)        # nouveau fichier / capacité changée
+                self._mm = mmap.mmap(f.fileno(), size)
+            view = memoryview(self._mm)
+            self._ts = view[_HEADER.size:_HEADER.size + 8 * capacity].cast("d")
+            self._val = view[_HEADER.size + 8 * capacity:].cast("d")
+            self._head, self._count = _HEADER.unpack_from(self._mm, 0)
+        else:
+            self._mm = None
+            self._ts = array("d", bytes(8 * capacity))
+            self._val = array("d", bytes(8 * capacity))
+            self._head = self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, ts: float, value: float) -> None:
+        with self._lock:
+            if self._count:
+                # horodatages croissants exigés par _bisect : deux threads
+                # producteurs + recalage NTP ⇒ point en retard ramené au dernier
+                ts = max(ts, self._ts[(self._head - 1) % self.capacity])
+            self._ts[self._head] = ts
+            self._val[self._head] = value
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            if self._mm is not None:
+                _HEADER.pack_into(self._mm, 0, self._head, self._count)
+
+    def _phys(self, i: int) -> int:
+        # indice logique (0 = plus ancien) → indice physique
+        return (self._head - self._count + i) % self.capacity
+
+    def _bisect(self, t: float) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts[self._phys(mid)] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def downsample(self, start: float, end: float, buckets: int) -> list[dict]:
+        """Par intervalle de [start, end[ : min, max, dernière valeur, nb de points."""
+        step = (end - start) / buckets
+        out: list[dict] = []
+        with self._lock:
+            i, stop = self._bisect(start), self._bisect(end)
+            cur = None
+            for j in range(i, stop):
+                p = self._phys(j)
+                t, v = self._ts[p], self._val[p]
+                b = min(int((t - start) / step), buckets - 1)
+                if cur is None or cur["b"] != b:
+                    cur = {"b": b, "t": round(start + b * step, 3),
+                           "min": v, "max": v, "last": v, "n": 0}
+                    out.append(cur)
+                cur["min"], cur["max"] = min(cur["min"], v), max(cur["max"], v)
+                cur["last"] = v; cur["n"] += 1
+        for c in out:
+            del c["b"]
+        return out
+
+
+def _numeric(value) -> float | None:
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    return None
+
+
+class Historian:
+    def __init__(self, tags: dict[str, str] = TAGS, period: float = HISTORIAN_PERIOD,
+                 capacity: int = HISTORIAN_CAPACITY, directory: str = HISTORIAN_DIR) -> None:
+        self.tags, self.period = tags, period
+        self._by_node = {node: name for name, node in tags.items()}
+        self._series: dict[tuple[str, str], RingSeries] = {}
+        if directory:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+        for ilot in OPCUA_ENDPOINTS:
+            for name in tags:
+                path = (str(Path(directory) / f"{ilot}_{name}.ring")
+                        if directory else None)
+                self._series[(ilot, name)] = RingSeries(capacity, path)
+        self._pending: dict[str, Future] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def series(self, ilot: str, tag: str) -> RingSeries | None:
+        return self._series.get((ilot, tag))
+
+    def start(self) -> None:
+        if self.period <= 0 or not self.tags or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        bus.subscribe(self._on_change)
+        self._thread = threading.Thread(target=self._run, name="historian", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        bus.unsubscribe(self._on_change)
+
+    def _on_change(self, evt: DataChange) -> None:
+        name = self._by_node.get(evt.node_id)
+        v = _numeric(evt.value)
+        if name and v is not None and (evt.ilot, name) in self._series:
+            self._series[(evt.ilot, name)].append(evt.timestamp, v)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.period):
+            for ilot in OPCUA_ENDPOINTS:
+                # îlot lent / injoignable : pas de nouvelle lecture tant que la précédente court
+                pending = self._pending.get(ilot)
+                if pending is None or pending.done():
+                    self._pending[ilot] = workers.submit(ilot, self._sample, ilot)
+
+    def _sample(self, ilot: str) -> None:
+        names = list(self.tags)
+        try:
+            values = with_plc(ilot, lambda plc: plc.read_many([self.tags[n] for n in names]))
+        except Exception:
+            return
+        now = time.time()
+        for name, value in zip(names, values):
+            v = _numeric(value)
+            if v is not None and not math.isnan(v):
+                self._series[(ilot, name)].append(now, v)
+
+
+historian = Historian()
@@ -7,15 +7,20 @@ IHM « Poste de Pilotage » – LGN-04
 """
 
 from __future__ import annotations
-import datetime, threading, tkinter as tk
+import datetime, os, queue, tkinter as tk
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tkinter import ttk, messagebox, filedialog, simpledialog
 from PIL import Image, ImageTk
 from opcua_client import get_states
 
 import rest_client
+import traceability
+from config import OPCUA_SUBSCRIBE
 from opcua_client import (
-    push_user, ROLE_OPERATOR, ROLE_MAINT, ROLE_UNKNOWN
+    push_user, ROLE_OPERATOR, ROLE_MAINT, ROLE_UNKNOWN, OPCUA_ENDPOINTS,
+    NODE_CURRENT_USER_ROLE, subscriptions,
 )
 
 # ------------------------------------------------------------------ #
@@ -24,6 +29,13 @@ from opcua_client import (
 ASSETS_DIR       = "/home/groupec/Documents/NEE/Assets"
 BADGE_OPERATEUR  = '&("(&c&-'          # UID badge opérateur
 BADGE_MAINT      = '&(-"écc-'          # UID badge maintenance
+UI_POLL_MS       = 16                  # relève des tâches de fond (~60 fps)
+LOG_CAP          = int(os.getenv("HMI_LOG_CAP", "50000"))     # logs gardés en mémoire
+LOG_VIEW_ROWS    = int(os.getenv("HMI_LOG_VIEW_ROWS", "2000")) # lignes affichées
+FILTER_DEBOUNCE_MS = 150
+OF_REFRESH_MS    = int(os.getenv("HMI_OF_REFRESH_MS", "15000"))  # rafraîchissement liste OF
+TRACE_PAGE       = 200                                            # lignes par page
+TRACE_PERIODS    = {"1 h": 3600, "24 h": 86400, "7 j": 7 * 86400, "∞": None}
 
 
 TRANSLATIONS = {
@@ -40,7 +52,8 @@ TRANSLATIONS = {
         "send_success": "OF {numero} envoyé avec succès.",
         "send_error": "Impossible d’envoyer l’OF.",
         "clear_logs": "🧹  Vider les logs",
-        "filter_label": "🔎  Filtrer :", "details": "Détails"
+        "filter_label": "🔎  Filtrer :", "details": "Détails",
+        "loading": "Chargement…", "search": "Rechercher", "more": "Suite…"
     },
     "en": {
         "title": "Production Dashboard LGN-04",
@@ -55,7 +68,8 @@ TRANSLATIONS = {
         "send_success": "MO {numero} successfully sent.",
         "send_error": "Unable to send the MO.",
         "clear_logs": "🧹  Clear logs",
-        "filter_label": "🔎  Filter :", "details": "Details"
+        "filter_label": "🔎  Filter :", "details": "Details",
+        "loading": "Loading…", "search": "Search", "more": "More…"
     },
 }
 
@@ -71,9 +85,30 @@ class PilotageApp(tk.Tk):
 
         # État
         self.lang, self.role = "fr", "non_identifié"
-        self.logs: list[tuple[str, str]] = []
+        # logs : tampon circulaire (n°, heure, message, clé de recherche)
+        self.logs: deque[tuple[int, str, str, str]] = deque(maxlen=LOG_CAP)
+        self._log_seq = 0
+        self._filt = ""                       # filtre appliqué
+        self._match: deque = deque()          # entrées correspondant au filtre
+        self._view: deque[str] = deque()      # iids affichés (ordre d'insertion)
+        self._filter_job = None
         self.search_var = tk.StringVar()
-        self.traceability_data: list[tuple[str, str, str]] = []
+        self.traceability_data: list[tuple] = []
+        self._trace_cursor = None
+
+        # Tâches de fond : I/O REST / OPC UA hors du thread Tk
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hmi")
+        self._done: queue.SimpleQueue = queue.SimpleQueue()
+        self._page = 0          # incrémenté à chaque changement de page
+        self._current = "dash"  # page affichée
+        self.tree_of = None     # liste OF : widget persistant (mis à jour par diff)
+        self._of_job = None
+
+        # rôle surveillé par abonnement : un badge repassé (rôle inchangé)
+        # n'est pas réécrit dans l'automate
+        if OPCUA_SUBSCRIBE:
+            subscriptions.watch("LGN01", [NODE_CURRENT_USER_ROLE])
+            subscriptions.start()
 
         # 2-1 : Barre haute
         top = tk.Frame(self, bg="#1b1f3b", height=60); top.pack(fill="x")
@@ -127,14 +162,44 @@ class PilotageApp(tk.Tk):
             Image.open(Path(ASSETS_DIR) / "logoENN.PNG").resize((200, 200))
         )
 
-        self.load_traceability()
         self.show_dashboard()
+        self.after(UI_POLL_MS, self._poll_tasks)
 
     # ------------------------------------------------------------------ #
     #   UTILITAIRES
     # ------------------------------------------------------------------ #
     def tr(self, k): return TRANSLATIONS[self.lang].get(k, k)
 
+    def run_bg(self, fn, *args, on_done=None, on_error=None, page_bound=True):
+        """
+        Exécute `fn(*args)` dans un thread ; `on_done(résultat)` ou
+        `on_error(exception)` sont rappelés dans le thread Tk.
+        `page_bound` : résultat ignoré si l'opérateur a changé de page.
+        """
+        token = self._page if page_bound else None
+        fut = self._executor.submit(fn, *args)
+        fut.add_done_callback(lambda f: self._done.put((token, f, on_done, on_error)))
+
+    def _poll_tasks(self):
+        while True:
+            try:
+                token, fut, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            if token is not None and token != self._page:
+                continue                          # page quittée : résultat périmé
+            exc = fut.exception()
+            try:
+                if exc is None:
+                    if on_done: on_done(fut.result())
+                elif on_error:
+                    on_error(exc)
+                else:
+                    self.log(f"Tâche KO : {exc}")
+            except Exception as e:
+                print("[HMI] callback KO :", e)
+        self.after(UI_POLL_MS, self._poll_tasks)
+
     def _add_flag(self, frame, lang, file):
         img = ImageTk.PhotoImage(Image.open(Path(ASSETS_DIR)/file).resize((32, 32)))
         tk.Button(frame, image=img, bd=0, bg="#1b1f3b",
@@ -147,6 +212,7 @@ class PilotageApp(tk.Tk):
         for b, k in zip(self.nav_btns,
                         ("dashboard", "of_selection", "status", "logs", "traceability")):
             b.config(text=self.tr(k))
+        self._clear(self.frames["of"]); self.tree_of = None   # reconstruite dans la langue
         self.show_dashboard()
 
     # ------------------------------------------------------------------ #
@@ -166,9 +232,8 @@ class PilotageApp(tk.Tk):
         self.role_label.config(text=f"Rôle : {self.role}")
         self.log(f"Badge {self.role} OK")
 
-        # Envoi OPC UA (thread pour IHM fluide)
-        threading.Thread(target=push_user, args=("LGN01", role_code),
-                         daemon=True).start()
+        # Envoi OPC UA (tâche de fond pour IHM fluide)
+        self.run_bg(push_user, "LGN01", role_code, page_bound=False)
 
     def need_auth(self, callback, allow="any"):
         if self.role == "non_identifié":
@@ -186,7 +251,10 @@ class PilotageApp(tk.Tk):
     #   REST status
     # ------------------------------------------------------------------ #
     def update_rest_status(self):
-        ok = rest_client.can_connect_to_rest()
+        self.run_bg(rest_client.can_connect_to_rest,
+                    on_done=self._set_rest_status, page_bound=False)
+
+    def _set_rest_status(self, ok):
         self.rest_status.config(text=f"REST : {'OK' if ok else 'OFF'}",
                                 fg="lightgreen" if ok else "yellow")
 
@@ -194,6 +262,7 @@ class PilotageApp(tk.Tk):
     #   PAGES
     # ------------------------------------------------------------------ #
     def show_frame(self, tag):  # helper
+        self._page += 1; self._current = tag
         for f in self.frames.values(): f.lower()
         self.frames[tag].tkraise()
 
@@ -212,7 +281,12 @@ class PilotageApp(tk.Tk):
     # ----- liste OF
     def show_of(self):
         self.update_rest_status()
-        f = self.frames["of"]; self._clear(f); self.show_frame("of")
+        f = self.frames["of"]; self.show_frame("of")
+        if self.tree_of is None:
+            self._build_of(f)
+        self._refresh_of(interactive=True)
+
+    def _build_of(self, f):
         tk.Label(f, text=self.tr("of_selection"),
                  fg="white", bg="#202540", font=("Segoe UI", 18, "bold")).pack(pady=8)
 
@@ -221,32 +295,75 @@ class PilotageApp(tk.Tk):
         for col, w in (("Num", 160), ("Code", 420), ("Qté", 100)):
             self.tree_of.heading(col, text=col); self.tree_of.column(col, width=w)
         self.tree_of.pack(padx=10, pady=12)
-
-        # REST
-        try:
-            for of in rest_client.get_of_list_cached():
-                self.tree_of.insert("", "end",
-                                    values=(of["numero"], of["code"], of["quantite"]))
-            self.log("Liste OF chargée")
-        except Exception as e:
-            self.log(f"REST KO : {e}")
-            messagebox.showerror("REST", "Impossible de récupérer la liste OF.")
+        self.tree_of.bind("<Double-1>", self.details_of)
+        self.tree_of.insert("", "end", iid="_loading", values=("", self.tr("loading"), ""))
 
         tk.Button(f, text=self.tr("send_of"), bg="green", fg="white",
                   command=self.send_selected).pack(pady=6)
 
+    def _refresh_of(self, interactive=False):
+        """Recharge la liste en tâche de fond, puis toutes les OF_REFRESH_MS tant que la page est affichée."""
+        if self._of_job is not None:
+            self.after_cancel(self._of_job); self._of_job = None
+        if self._current != "of": return
+        self.run_bg(rest_client.get_of_list_cached, on_done=self._fill_of,
+                    on_error=lambda e: self._of_error(e, interactive))
+        self._of_job = self.after(OF_REFRESH_MS, self._refresh_of)
+
+    def _fill_of(self, orders):
+        """Diff par numéro d'OF : sélection et défilement sont conservés."""
+        tree = self.tree_of
+        if tree is None or not tree.winfo_exists(): return
+        first = tree.exists("_loading")
+        if first: tree.delete("_loading")
+        shown = set(tree.get_children())
+        wanted = {}
+        for of in orders:
+            wanted.setdefault(of["numero"], (of["numero"], of["code"], of["quantite"]))
+        gone = [iid for iid in shown if iid not in wanted]
+        if gone: tree.delete(*gone)
+        changed = len(gone)
+        for iid, values in wanted.items():
+            if iid not in shown:
+                tree.insert("", "end", iid=iid, values=values); changed += 1
+            elif tuple(map(str, tree.item(iid, "values"))) != tuple(map(str, values)):
+                tree.item(iid, values=values); changed += 1
+        if list(tree.get_children()) != list(wanted):      # ordre changé / ajouts
+            for idx, iid in enumerate(wanted):
+                tree.move(iid, "", idx)
+        if first or changed:
+            self.log("Liste OF chargée" if first else f"Liste OF mise à jour ({changed})")
+
+    def _of_error(self, e, interactive=False):
+        if self.tree_of is not None and self.tree_of.exists("_loading"):
+            self.tree_of.delete("_loading")
+        self.log(f"REST KO : {e}")
+        if interactive:
+            messagebox.showerror("REST", "Impossible de récupérer la liste OF.")
+
     def details_of(self, _evt):
         sel = self.tree_of.selection(); self.tree_of.focus()
-        if not sel: return
+        if not sel or sel[0] == "_loading": return
         num = self.tree_of.item(sel[0], "values")[0]
-        comps = rest_client.get_of_components(num)
         p = tk.Toplevel(self); p.title(f"{self.tr('details')} – {num}")
         p.configure(bg="#202540"); p.geometry("420x300")
         tk.Label(p, text=f"OF {num}", bg="#202540", fg="white",
                  font=("Arial", 14, "bold")).pack(pady=8)
-        for c in comps:
-            tk.Label(p, text=c, bg="#202540", fg="white",
-                     anchor="w").pack(fill="x", padx=20)
+        wait = tk.Label(p, text=self.tr("loading"), bg="#202540", fg="lightgray")
+        wait.pack()
+
+        def fill(comps):
+            if not p.winfo_exists(): return       # fenêtre fermée entre-temps
+            wait.destroy()
+            for c in comps:
+                tk.Label(p, text=c, bg="#202540", fg="white",
+                         anchor="w").pack(fill="x", padx=20)
+
+        def error(e):
+            if p.winfo_exists(): wait.config(text=f"REST KO : {e}", fg="yellow")
+
+        self.run_bg(rest_client.get_of_components, num,
+                    on_done=fill, on_error=error, page_bound=False)
 
     def send_selected(self):
         sel = self.tree_of.selection()
@@ -260,12 +377,14 @@ class PilotageApp(tk.Tk):
 
         ilot = "LGN01"
 
-        date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ok = rest_client.start(ilot, num, code, qty)
-        self.log(f"{num} → {ilot} {'OK' if ok else 'KO'}")
-        (messagebox.showinfo if ok else messagebox.showerror)(
-            "OF", self.tr("send_success" if ok else "send_error").format(numero=num)
-        )
+        def done(ok):
+            self.log(f"{num} → {ilot} {'OK' if ok else 'KO'}")
+            (messagebox.showinfo if ok else messagebox.showerror)(
+                "OF", self.tr("send_success" if ok else "send_error").format(numero=num)
+            )
+
+        self.run_bg(rest_client.start, ilot, num, code, qty,
+                    on_done=done, on_error=lambda e: done(False), page_bound=False)
 
     # ----- status
     def show_status(self):
@@ -275,12 +394,26 @@ class PilotageApp(tk.Tk):
         tk.Label(f, text=self.tr("status"), fg="white", bg="#202540",
                 font=("Segoe UI", 18, "bold")).pack(pady=8)
 
-        states = get_states()            # ← interrogation directe OPC UA
-        for ilot, etat in states.items():
-            couleur = "lightgreen" if etat == "RUN" else ("yellow" if etat else "red")
-            tk.Label(f, text=f"{ilot} : {etat}",
-                    fg=couleur, bg="#202540",
-                    font=("Segoe UI", 14)).pack(pady=4)
+        wait = tk.Label(f, text=self.tr("loading"), fg="lightgray", bg="#202540")
+        wait.pack(pady=4)
+
+        def fill(states):
+            wait.destroy()
+            for ilot, etat in states.items():
+                couleur = "lightgreen" if etat == "RUN" else ("red" if etat == "OFF" else "yellow")
+                tk.Label(f, text=f"{ilot} : {etat}",
+                        fg=couleur, bg="#202540",
+                        font=("Segoe UI", 14)).pack(pady=4)
+
+        self.run_bg(self._fetch_states, on_done=fill)
+
+    @staticmethod
+    def _fetch_states():
+        # instantané de l'API (collecteur) ; OPC UA direct si l'API est KO
+        try:
+            return {i["ilot"]: i["etat"] for i in rest_client.status()}
+        except Exception:
+            return get_states()
 
     # ----- logs
     def show_logs(self):
@@ -300,44 +433,128 @@ class PilotageApp(tk.Tk):
                                       show="headings", height=18)
         self.tree_logs.heading("t", text="Heure"); self.tree_logs.column("t", width=160)
         self.tree_logs.heading("m", text="Message"); self.tree_logs.column("m", width=830)
-        self.tree_logs.pack(padx=10, pady=10); self.refresh_logs()
-
-    # ----- trace (démo)
-    def load_traceability(self):
-        self.traceability_data = [
-            ("WH/MO/00012", "En cours", "2025-02-27 14:22"),
-            ("WH/MO/00011", "OK",       "2025-02-27 11:05"),
-        ]
+        self.tree_logs.pack(padx=10, pady=10)
+        self._view.clear()                  # iids de l'ancien Treeview (détruit)
+        self._render_logs()
+
+    # ----- traçabilité (via l'API : envois IHM et REST ; base locale en secours)
+    @staticmethod
+    def load_traceability(of=None, ilot=None, period=None, cursor=None):
+        since = datetime.datetime.now().timestamp() - period if period else None
+        try:
+            page = rest_client.get_traceability(of=of or None, ilot=ilot or None, since=since,
+                                                cursor=cursor, limit=TRACE_PAGE)
+        except Exception:
+            page = traceability.store.query(of=of or None, ilot=ilot or None, since=since,
+                                            cursor=cursor, limit=TRACE_PAGE)
+        rows = [(e["of"] or "", e["ilot"] or "",
+                 f"{e['action']} {'OK' if e['ok'] else 'KO'}",
+                 "" if e["latency_ms"] is None else f"{e['latency_ms']:.0f} ms",
+                 datetime.datetime.fromtimestamp(e["ts"]).strftime("%Y-%m-%d %H:%M:%S"))
+                for e in page["events"]]
+        return rows, page["next_cursor"]
 
     def show_trace(self):
         f = self.frames["trace"]; self._clear(f); self.show_frame("trace")
         tk.Label(f, text=self.tr("traceability"), fg="white", bg="#202540",
                  font=("Segoe UI", 18, "bold")).pack(pady=10)
-        tree = ttk.Treeview(f, columns=("OF", "Etat", "Horodatage"),
-                            show="headings", height=16)
-        for col, w in (("OF", 160), ("Etat", 220), ("Horodatage", 250)):
+
+        bar = tk.Frame(f, bg="#202540"); bar.pack()
+        of_var, ilot_var, period_var = tk.StringVar(), tk.StringVar(), tk.StringVar(value="24 h")
+        tk.Label(bar, text="OF", fg="white", bg="#202540").pack(side="left")
+        tk.Entry(bar, textvariable=of_var, width=16).pack(side="left", padx=4)
+        tk.Label(bar, text="Îlot", fg="white", bg="#202540").pack(side="left")
+        ttk.Combobox(bar, textvariable=ilot_var, values=["", *OPCUA_ENDPOINTS],
+                     width=8, state="readonly").pack(side="left", padx=4)
+        ttk.Combobox(bar, textvariable=period_var, values=list(TRACE_PERIODS),
+                     width=6, state="readonly").pack(side="left", padx=4)
+
+        cols = (("OF", 160), ("Îlot", 80), ("Etat", 220), ("Latence", 100), ("Horodatage", 200))
+        tree = ttk.Treeview(f, columns=[c for c, _ in cols], show="headings", height=16)
+        for col, w in cols:
             tree.heading(col, text=col); tree.column(col, width=w)
         tree.pack(padx=12, pady=12)
-        for row in self.traceability_data: tree.insert("", "end", values=row)
+        more = tk.Button(f, text=self.tr("more"))
+
+        def fill(result, reset):
+            rows, self._trace_cursor = result
+            if reset:
+                tree.delete(*tree.get_children()); self.traceability_data = []
+            for row in rows: tree.insert("", "end", values=row)
+            self.traceability_data.extend(rows)
+            more.config(state="normal" if self._trace_cursor else "disabled")
+
+        def search(reset=True):
+            args = (of_var.get().strip(), ilot_var.get(), TRACE_PERIODS[period_var.get()],
+                    None if reset else self._trace_cursor)
+            self.run_bg(self.load_traceability, *args, on_done=lambda r: fill(r, reset))
+
+        tk.Button(bar, text=self.tr("search"), command=search).pack(side="left", padx=4)
+        more.config(command=lambda: search(reset=False)); more.pack()
+        search()
 
     # ------------------------------------------------------------------ #
     #   LOGS utils
     # ------------------------------------------------------------------ #
     def log(self, msg: str):
+        """O(1) : ajout au tampon + une ligne dans la vue si le filtre correspond."""
         ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.logs.append((ts, msg)); print(ts, msg); self.refresh_logs()
+        self._log_seq += 1
+        entry = (self._log_seq, ts, msg, f"{ts}\x00{msg}".lower())
+        if len(self.logs) == self.logs.maxlen:               # éviction du plus ancien
+            oldest = self.logs[0]
+            if self._match and self._match[0] is oldest:
+                self._match.popleft()
+                if self._view and self._view[0] == str(oldest[0]) and self._tree_ok():
+                    self.tree_logs.delete(self._view.popleft())
+        self.logs.append(entry); print(ts, msg)
+        if self._filt in entry[3]:
+            self._match.append(entry)
+            if self._tree_ok(): self._tree_add(entry)
+
+    def _tree_ok(self):
+        return getattr(self, "tree_logs", None) is not None and self.tree_logs.winfo_exists()
+
+    def _tree_add(self, entry):
+        iid = str(entry[0])
+        self.tree_logs.insert("", "end", iid=iid, values=(entry[1], entry[2]))
+        self._view.append(iid)
+        while len(self._view) > LOG_VIEW_ROWS:
+            self.tree_logs.delete(self._view.popleft())
+
+    def _render_logs(self):
+        if not self._tree_ok(): return
+        self.tree_logs.delete(*self._view); self._view.clear()
+        for entry in list(self._match)[-LOG_VIEW_ROWS:]:
+            self._tree_add(entry)
 
     def refresh_logs(self, *_):
-        if not getattr(self, "tree_logs", None): return
+        """Frappe dans le filtre : application différée (anti-rebond)."""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DEBOUNCE_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
         filt = self.search_var.get().lower()
-        self.tree_logs.delete(*self.tree_logs.get_children())
-        for t, m in self.logs:
-            if filt in t.lower() or filt in m.lower():
-                self.tree_logs.insert("", "end", values=(t, m))
+        if filt == self._filt: return
+        # filtre prolongé ⇒ on ne parcourt que les résultats précédents
+        source = self._match if filt.startswith(self._filt) else self.logs
+        all_shown = len(self._match) <= LOG_VIEW_ROWS
+        narrowing = source is self._match
+        self._filt = filt
+        self._match = deque(e for e in source if filt in e[3])
+        if narrowing and all_shown and self._tree_ok():
+            keep = {str(e[0]) for e in self._match}
+            gone = [iid for iid in self._view if iid not in keep]
+            if gone: self.tree_logs.delete(*gone)
+            self._view = deque(iid for iid in self._view if iid in keep)
+        else:
+            self._render_logs()
 
     def clear_logs(self):
         if messagebox.askyesno("?", self.tr("clear_logs")):
-            self.logs.clear(); self.refresh_logs()
+            self.logs.clear(); self._match.clear(); self._render_logs()
 
     def export_logs(self):
         path = filedialog.asksaveasfilename(defaultextension=".csv",
@@ -345,7 +562,7 @@ class PilotageApp(tk.Tk):
         if not path: return
         with open(path, "w", encoding="utf-8") as f:
             f.write("Heure,Message\n")
-            for t, m in self.logs:
+            for _, t, m, _ in self.logs:
                 f.write(f"{t},{m}\n")
         messagebox.showinfo("Export", f"{len(self.logs)} logs → {path}")
 
@@ -0,0 +1,128 @@
+# metrics.py ──────────────────────────────────────────────────────
+"""
+Compteurs et histogrammes de latence au format texte Prometheus.
+─ coût par mesure : un verrou + quelques additions (pas de dépendance)
+─ /api/metrics : render()
+
+    with ODOO_SECONDS.time(model="mrp.production", method="search_read"):
+        ...
+"""
+
+from __future__ import annotations
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# bornes (s) : de la milliseconde (OPC UA local) à la dizaine de secondes (timeouts)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list = []
+
+
+def _labels(names: tuple[str, ...], key: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, key)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = ()) -> None:
+        self.name, self.doc, self.labelnames = name, doc, labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in items]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name, self.doc, self.labelnames = name, doc, labels
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}     # clé -> [compteurs par borne…, somme, total]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                s[idx] += 1                      # cumul calculé au rendu
+            s[-2] += value
+            s[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(s)) for k, s in self._series.items())
+        for key, s in items:
+            cumul = 0
+            for bound, n in zip(self.buckets, s):
+                cumul += n
+                le = _labels(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {cumul}")
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {s[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {s[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {s[-1]}")
+        return lines
+
+
+@contextmanager
+def measure(hist: Histogram, errors: Counter, **labels):
+    """Chronomètre un appel ; compte une erreur s'il lève une exception."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        errors.inc(**labels)
+        raise
+    finally:
+        hist.observe(time.perf_counter() - t0, **labels)
+
+
+def render() -> str:
+    return "\n".join(line for m in _registry for line in m.render()) + "\n"
+
+
+# --- métriques de l'application ------------------------------------ #
+ODOO_SECONDS  = Histogram("odoo_call_seconds", "Durée des appels XML-RPC Odoo",
+                          ("model", "method"))
+ODOO_ERRORS   = Counter("odoo_call_errors_total", "Appels Odoo en échec",
+                        ("model", "method"))
+OPCUA_SECONDS = Histogram("opcua_op_seconds", "Durée des opérations OPC UA par îlot",
+                          ("ilot", "op"))
+OPCUA_ERRORS  = Counter("opcua_op_errors_total", "Opérations OPC UA en échec",
+                        ("ilot", "op"))
+HTTP_SECONDS  = Histogram("http_request_seconds", "Durée des requêtes de l'API",
+                          ("route", "method", "status"))
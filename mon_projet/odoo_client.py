@@ -1,63 +1,304 @@
 # odoo_client.py ──────────────────────────────────────────────────
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
 import xmlrpc.client
-from typing import List, Dict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Tuple
 from config import ODOO_URL, ODOO_DB, ODOO_USER, ODOO_PASS
+from metrics import measure, ODOO_SECONDS, ODOO_ERRORS
 
-def _connect():
-    common = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/common")
-    uid    = common.authenticate(ODOO_DB, ODOO_USER, ODOO_PASS, {})
-    if not uid:
-        raise RuntimeError("⛔️  Authentification Odoo impossible")
-    models = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/object")
-    return uid, models
+# durée de vie du cache des codes nomenclature (s) – les BOM changent rarement
+BOM_CACHE_TTL = float(os.getenv("ODOO_BOM_CACHE_TTL", "600"))
+_bom_codes: Dict[int, tuple] = {}      # bom_id -> (code, expiration)
+_bom_lock = threading.Lock()
 
-# Liste OF
-def list_orders() -> List[Dict]:
-    uid, models = _connect()
-    raws = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASS,
-        'mrp.production', 'search_read',
-        [[]],
-        {'fields': ['name', 'product_id', 'product_qty', 'state', 'bom_id'],
-         'limit': 100, 'order': 'id desc'}
-    )
+# index local des OF (synchro incrémentale sur write_date)
+ORDER_INDEX_SIZE    = int(os.getenv("ODOO_INDEX_SIZE", "100"))        # OF servis
+ORDER_SYNC_INTERVAL = float(os.getenv("ODOO_SYNC_INTERVAL", "2"))     # s entre 2 synchros
+ORDER_INDEX_PATH    = os.getenv("ODOO_INDEX_PATH", "")                # "" = mémoire seule
+COMPONENTS_CACHE_SIZE = 1000                                          # OF mémorisés
+ODOO_POOL_SIZE      = int(os.getenv("ODOO_POOL_SIZE", "4"))           # connexions gardées
+ORDER_DATE_FIELD    = os.getenv("ODOO_ORDER_DATE_FIELD", "date_planned_start")  # filtre dates
 
-    def _bom_code(bom_id: int | None):
-        if not bom_id:
-            return "?"
-        [rec] = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASS,
-            'mrp.bom', 'read', [bom_id],
-            {'fields': ['code']}
-        )
-        return rec.get("code") or "?"
+# --- client XML-RPC réutilisable ---------------------------------- #
+def _is_auth_error(fault: xmlrpc.client.Fault) -> bool:
+    return fault.faultCode == 3 or "AccessDenied" in str(fault.faultString)
+
+
+class OdooClient:
+    """
+    Client Odoo partageable entre threads (workers Flask) :
+    ─ uid mis en cache, ré-authentification seulement sur erreur d'accès
+    ─ petite réserve de ServerProxy par service : chacun garde sa connexion
+      HTTP/1.1 ouverte et sert un seul thread à la fois ; le serveur de dev
+      Flask crée un thread par requête, la réserve survit à ces threads
+    """
+
+    def __init__(self, url: str = ODOO_URL, db: str = ODOO_DB,
+                 user: str = ODOO_USER, password: str = ODOO_PASS) -> None:
+        self.url, self.db, self.user, self.password = url, db, user, password
+        self._uid: int | None = None
+        self._uid_lock = threading.Lock()
+        self._pools = {service: queue.Queue(ODOO_POOL_SIZE) for service in ("common", "object")}
+
+    @contextmanager
+    def _proxy(self, service: str):
+        pool = self._pools[service]
+        try:
+            proxy = pool.get_nowait()
+        except queue.Empty:
+            proxy = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/{service}",
+                                              allow_none=True)
+        try:
+            yield proxy
+        finally:
+            # le Transport referme / rouvre lui-même une connexion en erreur
+            try:
+                pool.put_nowait(proxy)
+            except queue.Full:
+                proxy("close")()
+
+    @property
+    def uid(self) -> int:
+        if self._uid is None:
+            with self._uid_lock:
+                if self._uid is None:
+                    with measure(ODOO_SECONDS, ODOO_ERRORS,
+                                 model="res.users", method="authenticate"):
+                        with self._proxy("common") as common:
+                            uid = common.authenticate(self.db, self.user, self.password, {})
+                    if not uid:
+                        raise RuntimeError("⛔️  Authentification Odoo impossible")
+                    self._uid = uid
+        return self._uid
+
+    def execute_kw(self, model: str, method: str, args: list, kw: dict | None = None):
+        try:
+            return self._call(model, method, args, kw)
+        except xmlrpc.client.Fault as f:
+            if not _is_auth_error(f):
+                raise
+            self._uid = None            # uid périmé : nouvel essai unique
+            return self._call(model, method, args, kw)
+
+    def _call(self, model: str, method: str, args: list, kw: dict | None):
+        uid = self.uid
+        with measure(ODOO_SECONDS, ODOO_ERRORS, model=model, method=method), \
+                self._proxy("object") as obj:
+            return obj.execute_kw(self.db, uid, self.password, model, method, args, kw or {})
+
+
+_client = OdooClient()
+
+# --- index local des OF --------------------------------------------- #
+class OrderIndex:
+    """
+    Copie locale des `size` derniers `mrp.production`.
+    Une synchro = 2 appels légers :
+      ─ `search` des ids de la fenêtre (détecte ajouts / suppressions)
+      ─ `search_read` des seuls OF modifiés depuis le dernier write_date vu
+    Persistance JSON facultative (`path`) pour repartir à chaud.
+    """
+    FIELDS = ['name', 'product_id', 'product_qty', 'state', 'bom_id', 'write_date']
+
+    def __init__(self, client: OdooClient, size: int = ORDER_INDEX_SIZE,
+                 interval: float = ORDER_SYNC_INTERVAL, path: str = ORDER_INDEX_PATH) -> None:
+        self._client, self.size, self.interval = client, size, interval
+        self._path = Path(path) if path else None
+        self._records: Dict[int, Dict] = {}
+        self._last_write: str | None = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    def sync(self, force: bool = False) -> None:
+        with self._lock:
+            if not force and time.monotonic() - self._synced_at < self.interval:
+                return
+            ids = self._client.execute_kw(
+                'mrp.production', 'search', [[]],
+                {'limit': self.size, 'order': 'id desc'})
+            window = set(ids)
+            # write_date est à la seconde : `>=` pour ne rien rater (doublons écrasés)
+            domain = [['id', 'in', ids]]
+            if self._last_write:
+                domain.append(['write_date', '>=', self._last_write])
+            changed = self._client.execute_kw(
+                'mrp.production', 'search_read', [domain], {'fields': self.FIELDS})
+            unknown = window - self._records.keys() - {r['id'] for r in changed}
+            if unknown:
+                changed += self._client.execute_kw(
+                    'mrp.production', 'read', [sorted(unknown)], {'fields': self.FIELDS})
+
+            # `>=` renvoie toujours au moins le dernier OF vu : sauvegarde
+            # uniquement si un enregistrement a réellement changé
+            dirty = bool(self._records.keys() - window)
+            for rid in self._records.keys() - window:
+                del self._records[rid]
+            for r in changed:
+                if self._records.get(r['id']) != r:
+                    self._records[r['id']] = r
+                    dirty = True
+                if not self._last_write or r['write_date'] > self._last_write:
+                    self._last_write = r['write_date']
+            self._synced_at = time.monotonic()
+            if dirty:
+                self._save()
+
+    def raws(self) -> List[Dict]:
+        with self._lock:
+            return [self._records[i] for i in sorted(self._records, reverse=True)]
 
-    return [{
+    def _load(self) -> None:
+        if not self._path or not self._path.exists():
+            return
+        try:
+            data = json.loads(self._path.read_text())
+            self._records = {r['id']: r for r in data['records']}
+            self._last_write = data['last_write']
+        except Exception as e:
+            print(f"[ODOO] index illisible, resynchro complète : {e}")
+
+    def _save(self) -> None:
+        if not self._path:
+            return
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"last_write": self._last_write,
+                                   "records": list(self._records.values())}))
+        tmp.replace(self._path)
+
+
+_orders = OrderIndex(_client)
+
+
+def _format_order(r: Dict, codes: Dict[int, str]) -> Dict:
+    return {
         "numero":   r['name'],
-        "code":     f"{r['product_id'][1] if r['product_id'] else 'Article ?'} ({_bom_code(r.get('bom_id') and r['bom_id'][0])})",
+        "code":     f"{r['product_id'][1] if r['product_id'] else 'Article ?'} ({codes.get(r['bom_id'][0], '?') if r.get('bom_id') else '?'})",
         "quantite": r['product_qty'],
         "etat":     r['state']
-    } for r in raws]
+    }
+
+# Liste OF
+def list_orders() -> List[Dict]:
+    return list_orders_etag()[0]
+
+def list_orders_etag() -> Tuple[List[Dict], str]:
+    """Liste OF (servie par l'index local) + ETag de son contenu."""
+    _orders.sync()
+    raws = _orders.raws()
+    codes = _bom_codes_for([r['bom_id'][0] for r in raws if r.get('bom_id')])
+    orders = [_format_order(r, codes) for r in raws]
+    etag = hashlib.sha1(json.dumps(orders, sort_keys=True).encode()).hexdigest()
+    return orders, etag
+
+def search_orders(state: List[str] | None = None, product: str | None = None,
+                  date_from: str | None = None, date_to: str | None = None,
+                  name_prefix: str | None = None, cursor: int | None = None,
+                  limit: int = 50) -> Dict:
+    """
+    Recherche filtrée côté Odoo + pagination par curseur (id décroissant).
+    Retourne {"orders", "total", "next_cursor"} ; `next_cursor` = None en fin.
+    """
+    domain: list = []
+    if state:
+        domain.append(['state', 'in', state])
+    if product:
+        domain.append(['product_id', 'ilike', product])
+    if date_from:
+        domain.append([ORDER_DATE_FIELD, '>=', date_from])
+    if date_to:
+        domain.append([ORDER_DATE_FIELD, '<=', date_to])
+    if name_prefix:
+        domain.append(['name', '=like', f"{name_prefix}%"])
+
+    total = _client.execute_kw('mrp.production', 'search_count', [domain])
+    page = domain + ([['id', '<', cursor]] if cursor else [])
+    raws = _client.execute_kw(
+        'mrp.production', 'search_read', [page],
+        {'fields': OrderIndex.FIELDS, 'limit': limit + 1, 'order': 'id desc'})
+
+    more, raws = len(raws) > limit, raws[:limit]
+    codes = _bom_codes_for([r['bom_id'][0] for r in raws if r.get('bom_id')])
+    return {
+        "orders":      [_format_order(r, codes) for r in raws],
+        "total":       total,
+        "next_cursor": raws[-1]['id'] if more else None,
+    }
+
+def _bom_codes_for(bom_ids) -> Dict[int, str]:
+    """
+    Codes des nomenclatures : cache TTL + UNE lecture groupée `mrp.bom.read`
+    pour les identifiants absents ou expirés (au lieu d'un read par OF).
+    """
+    now = time.monotonic()
+    with _bom_lock:
+        codes = {b: _bom_codes[b][0] for b in set(bom_ids)
+                 if b in _bom_codes and _bom_codes[b][1] > now}
+    missing = sorted(set(bom_ids) - codes.keys())
+    if missing:
+        recs = _client.execute_kw(
+            'mrp.bom', 'read', [missing],
+            {'fields': ['code']}
+        )
+        with _bom_lock:
+            for rec in recs:
+                code = rec.get("code") or "?"
+                codes[rec['id']] = code
+                _bom_codes[rec['id']] = (code, now + BOM_CACHE_TTL)
+    return codes
 
 # Composants d’un OF
+_components: Dict[str, tuple] = {}     # OF -> (write_date, composants)
+_components_lock = threading.Lock()
+
 def list_components(of_name: str) -> List[str]:
-    uid, models = _connect()
-    recs = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASS,
+    return list_components_batch([of_name])[of_name]
+
+def list_components_batch(of_names: List[str]) -> Dict[str, List[str]]:
+    """
+    Composants de plusieurs OF en 2 appels Odoo au plus :
+    `mrp.production.search_read` puis UN `stock.move.read` groupé.
+    Cache par OF, invalidé dès que le write_date de l'OF change.
+    """
+    recs = _client.execute_kw(
         'mrp.production', 'search_read',
-        [[['name', '=', of_name]]],
-        {'fields': ['move_raw_ids'], 'limit': 1}
+        [[['name', 'in', list(of_names)]]],
+        {'fields': ['name', 'move_raw_ids', 'write_date']}
     )
-    if not recs:
-        return [f"OF '{of_name}' introuvable"]
+    found = {r['name']: r for r in recs}
 
-    move_ids = recs[0]['move_raw_ids']
-    if not move_ids:
-        return ["Aucun composant"]
+    result: Dict[str, List[str]] = {}
+    todo: List[Dict] = []
+    with _components_lock:
+        for name in of_names:
+            r = found.get(name)
+            if r is None:
+                result[name] = [f"OF '{name}' introuvable"]
+            elif not r['move_raw_ids']:
+                result[name] = ["Aucun composant"]
+            elif name in _components and _components[name][0] == r['write_date']:
+                result[name] = _components[name][1]
+            else:
+                todo.append(r)
 
-    moves = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASS,
-        'stock.move', 'read', [move_ids],
-        {'fields': ['product_id', 'product_uom_qty']}
-    )
-    return [f"{m['product_id'][1]} x{m['product_uom_qty']}" for m in moves]
\ No newline at end of file
+    if todo:
+        moves = _client.execute_kw(
+            'stock.move', 'read', [[m for r in todo for m in r['move_raw_ids']]],
+            {'fields': ['product_id', 'product_uom_qty']}
+        )
+        by_id = {m['id']: f"{m['product_id'][1]} x{m['product_uom_qty']}" for m in moves}
+        with _components_lock:
+            for r in todo:
+                comps = [by_id[m] for m in r['move_raw_ids'] if m in by_id]
+                result[r['name']] = comps
+                _components.pop(r['name'], None)
+                _components[r['name']] = (r['write_date'], comps)
+            while len(_components) > COMPONENTS_CACHE_SIZE:
+                del _components[next(iter(_components))]
+    return result
@@ -0,0 +1,64 @@
+# opcua_async.py ──────────────────────────────────────────────────
+"""
+Version asyncio des fonctions haut niveau de `opcua_client`.
+─ freeopcua est synchrone : chaque appel est confié à la file de l'îlot
+  (`opcua_client.workers`, un thread par PLC) et attendu sans bloquer
+  la boucle ⇒ N îlots pilotés en parallèle avec N threads au total
+─ les sessions, caches et impulsions restent ceux de `opcua_client`,
+  les fonctions synchrones (IHM Tk) sont inchangées
+
+    results = await asyncio.gather(
+        send_order_details("LGN01", "WH/MO/00017", "Assemblage (27)", 2),
+        send_order_details("LGN02", "WH/MO/00017", "Assemblage (27)", 2),
+    )
+"""
+
+from __future__ import annotations
+import asyncio
+from typing import Callable
+
+import opcua_client as oc
+from opcua_client import OPCUA_ENDPOINTS, OPCUA_STATUS_TIMEOUT
+
+
+async def run_on_ilot(ilot: str, fn: Callable, *args, **kwargs):
+    """Exécute `fn` dans la file de l'îlot (ordre préservé par PLC)."""
+    return await asyncio.wrap_future(oc.workers.submit(ilot, fn, *args, **kwargs))
+
+
+async def start_order(ilot: str, of_number: str, force: bool = False) -> bool:
+    return await run_on_ilot(ilot, oc.start_order, ilot, of_number, force)
+
+
+async def send_order_details(ilot: str, of_number: str, code: str, qty: float | int,
+                             *, force: bool = False) -> bool:
+    return await run_on_ilot(ilot, oc.send_order_details, ilot, of_number, code, qty,
+                             force=force)
+
+
+async def push_user(ilot: str, role: int, force: bool = False) -> bool:
+    return await run_on_ilot(ilot, oc.push_user, ilot, role, force)
+
+
+async def pulse_bit(ilot: str, node_id: str, duration: float = 1.0) -> bool:
+    """Attend la fin de l'impulsion (remise à 0) sans bloquer la boucle."""
+    fut = await run_on_ilot(ilot, oc.schedule_pulse, ilot, node_id, duration)
+    return await asyncio.wrap_future(fut)
+
+
+async def read_state(ilot: str, timeout: float = OPCUA_STATUS_TIMEOUT) -> str:
+    try:
+        return await asyncio.wait_for(run_on_ilot(ilot, oc.read_state, ilot), timeout)
+    except asyncio.TimeoutError:
+        return "OFF"
+
+
+async def get_states(timeout: float = OPCUA_STATUS_TIMEOUT) -> dict[str, str]:
+    ilots = list(OPCUA_ENDPOINTS)
+    states = await asyncio.gather(*(read_state(i, timeout) for i in ilots))
+    return dict(zip(ilots, states))
+
+
+if __name__ == "__main__":
+    import pprint
+    pprint.pp(asyncio.run(get_states()))
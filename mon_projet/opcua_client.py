@@ -4,14 +4,26 @@ Wrapper "friendly" autour de la librairie *freeopcua*.
 ─ Gestion de plusieurs îlots : LGN01 / LGN02 / LGN03
 ─ Lecture / écriture de tags (NodeId)
 ─ Fonctions utilitaires : start_order, send_order_details + get_states
+─ Pool de sessions persistantes (une par îlot) : keepalive, reconnexion,
+  fermeture des sessions inactives
 """
 
 from __future__ import annotations
+import atexit
+import heapq
 import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Iterable, NamedTuple
 from dotenv import load_dotenv
 from opcua import Client, ua
 import time
 
+import traceability
+from metrics import measure, OPCUA_SECONDS, OPCUA_ERRORS
+
 ROLE_UNKNOWN, ROLE_OPERATOR, ROLE_MAINT = 0, 1, 2
 # -----------------------------------------------------------------------------
 # 1) Chargement des variables d’environnement (.env facultatif)
@@ -25,6 +37,21 @@ OPCUA_ENDPOINTS: dict[str, str] = {
     "LGN03": os.getenv("OPCUA_LGN03", "opc.tcp://172.30.30.130:4840").strip(),
 }
 
+# Réglages du pool de sessions (secondes)
+OPCUA_TIMEOUT      = float(os.getenv("OPCUA_TIMEOUT", "4"))         # requêtes + connexion
+OPCUA_KEEPALIVE    = float(os.getenv("OPCUA_KEEPALIVE", "10"))      # période de ping
+OPCUA_IDLE_TIMEOUT = float(os.getenv("OPCUA_IDLE_TIMEOUT", "300"))  # fermeture si inactif
+OPCUA_STATUS_TIMEOUT = float(os.getenv("OPCUA_STATUS_TIMEOUT", "2"))  # délai max get_states
+OPCUA_SUB_PERIOD_MS  = int(os.getenv("OPCUA_SUB_PERIOD_MS", "250"))     # publication abonnements
+OPCUA_SHADOW_TTL     = float(os.getenv("OPCUA_SHADOW_TTL", "1"))        # image non surveillée
+
+# Disjoncteur par endpoint : ouvert après N échecs, ré-essai avec délai croissant
+OPCUA_BREAKER_FAILURES    = int(os.getenv("OPCUA_BREAKER_FAILURES", "3"))
+OPCUA_BREAKER_BACKOFF     = float(os.getenv("OPCUA_BREAKER_BACKOFF", "2"))    # 1er délai
+OPCUA_BREAKER_MAX_BACKOFF = float(os.getenv("OPCUA_BREAKER_MAX_BACKOFF", "60"))
+
+_ILOT_BY_URL = {url: ilot for ilot, url in OPCUA_ENDPOINTS.items()}   # libellé métriques
+
 # -----------------------------------------------------------------------------
 # 2) NodeIds standards (à adapter selon ta config automate)
 # -----------------------------------------------------------------------------
@@ -49,9 +76,347 @@ NODE_CURRENT_USER_ROLE  = (
 )   # quantité
 NODE_VALIDATE_P4 = "ns=4;s=|var|WAGO 750-8212 PFC200 G2 2ETH RS.Application.GVL_OPCUA.BP_Vld_OF_P4"
 
+# Nœuds écrits par l'IHM / l'API : surveillés (abonnement) pour que les
+# écritures redondantes puissent être sautées sans risque
+SHADOW_NODES = [NODE_START_ORDER, NODE_ORDER_CODE, NODE_ORDER_QTY, NODE_CURRENT_USER_ROLE]
+
+_INT_TYPES = {
+    ua.VariantType.SByte, ua.VariantType.Byte, ua.VariantType.Int16, ua.VariantType.UInt16,
+    ua.VariantType.Int32, ua.VariantType.UInt32, ua.VariantType.Int64, ua.VariantType.UInt64,
+}
+
+# Libellés de NODE_STATE_MACHINE renvoyés par get_states()
+STATE_LABELS = {0: "STOP", 1: "RUN", 2: "ALARM"}
+
+
+NODE_SERVER_STATE = ua.NodeId(ua.ObjectIds.Server_ServerStatus_State)  # ping
+
+# Codes d'erreur signifiant que la session / le canal est perdu
+_SESSION_LOST = {
+    ua.StatusCodes.BadSessionIdInvalid,
+    ua.StatusCodes.BadSessionClosed,
+    ua.StatusCodes.BadSecureChannelIdInvalid,
+    ua.StatusCodes.BadSecureChannelClosed,
+    ua.StatusCodes.BadConnectionClosed,
+    ua.StatusCodes.BadTimeout,
+}
+
+
+def _channel_lost(exc: BaseException) -> bool:
+    """
+    True si l'exception implique de refaire la connexion (PLC / réseau),
+    et non une erreur de NodeId ou de valeur (session conservée).
+    """
+    if isinstance(exc, ua.UaStatusCodeError):
+        return exc.code in _SESSION_LOST
+    return isinstance(exc, (OSError, FutureTimeout))
+
+
+def check_node_ids(node_ids: Iterable[str]) -> None:
+    """Lève ValueError sur le premier NodeId mal formé (avant toute session)."""
+    for node_id in node_ids:
+        try:
+            ua.NodeId.from_string(node_id)
+        except Exception as e:
+            raise ValueError(f"NodeId invalide : {node_id!r}") from e
+
+
+# -----------------------------------------------------------------------------
+# 3) Pool de sessions : une connexion longue durée par endpoint
+# -----------------------------------------------------------------------------
+class CircuitOpenError(ConnectionError):
+    """Îlot déclaré injoignable : appel refusé sans tenter de connexion."""
+
+
+class _Breaker:
+    """État santé d'un endpoint : closed → open → half_open → closed / open."""
+
+    def __init__(self, backoff: float) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.backoff = backoff
+        self.retry_at = 0.0
+        self.probing = False
+        self.last_error: str | None = None
+        self.last_ok: float | None = None
+        self.last_failure: float | None = None
+
+
+class HealthRegistry:
+    """
+    Disjoncteur partagé par endpoint.
+    ─ `failures` échecs de connexion consécutifs ⇒ ouvert : les appels
+      échouent aussitôt (CircuitOpenError) au lieu d'attendre le timeout
+    ─ à l'échéance, un seul appel passe (half_open) : succès ⇒ fermé,
+      échec ⇒ ré-ouvert avec un délai doublé (plafonné à `max_backoff`)
+    """
+
+    def __init__(self, failures: int = OPCUA_BREAKER_FAILURES,
+                 backoff: float = OPCUA_BREAKER_BACKOFF,
+                 max_backoff: float = OPCUA_BREAKER_MAX_BACKOFF) -> None:
+        self.threshold = max(failures, 1)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._breakers: dict[str, _Breaker] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, url: str) -> _Breaker:
+        # appelé verrou pris
+        br = self._breakers.get(url)
+        if br is None:
+            br = self._breakers[url] = _Breaker(self.backoff)
+        return br
+
+    def before(self, url: str) -> bool:
+        """
+        Lève CircuitOpenError si l'endpoint est en quarantaine.
+        Retourne True si l'appelant est la sonde half_open (une seule à la fois).
+        """
+        with self._lock:
+            br = self._get(url)
+            if br.state == "closed":
+                return False
+            if br.probing or time.monotonic() < br.retry_at:
+                raise CircuitOpenError(f"{_ILOT_BY_URL.get(url, url)} injoignable "
+                                       f"(disjoncteur ouvert : {br.last_error})")
+            br.state, br.probing = "half_open", True     # cet appel sert de sonde
+            return True
+
+    def success(self, url: str) -> None:
+        with self._lock:
+            br = self._get(url)
+            if br.state != "closed":
+                print(f"[OPCUA] {_ILOT_BY_URL.get(url, url)} de nouveau joignable")
+            br.state, br.failures, br.probing = "closed", 0, False
+            br.backoff = self.backoff
+            br.last_ok = time.time()
+
+    def failure(self, url: str, exc: BaseException) -> None:
+        with self._lock:
+            br = self._get(url)
+            br.failures += 1
+            br.last_error = str(exc) or type(exc).__name__
+            br.last_failure = time.time()
+            if br.state == "half_open":
+                br.backoff = min(br.backoff * 2, self.max_backoff)
+            elif br.failures < self.threshold:
+                return
+            br.state, br.probing = "open", False
+            br.retry_at = time.monotonic() + br.backoff
+
+    def release_probe(self, url: str) -> None:
+        """Sonde terminée sans verdict (erreur applicative) : autre essai possible."""
+        with self._lock:
+            br = self._get(url)
+            if br.state == "half_open":
+                br.state, br.probing = "open", False
+
+    def snapshot(self) -> dict[str, dict]:
+        """{ilot: état du disjoncteur} pour l'API / l'IHM."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                _ILOT_BY_URL.get(url, url): {
+                    "state": br.state,
+                    "failures": br.failures,
+                    "retry_in": round(max(br.retry_at - now, 0.0), 1) if br.state != "closed" else None,
+                    "last_error": br.last_error,
+                    "last_ok": br.last_ok,
+                    "last_failure": br.last_failure,
+                }
+                for url, br in self._breakers.items()
+            }
+
+
+health = HealthRegistry()
+
+
+def _same(known, value) -> bool:
+    """Même valeur ET même type (True == 1 en Python, pas pour l'automate)."""
+    return type(known) is type(value) and known == value
+
+
+class _Session:
+    """Client OPC UA connecté + verrou (un seul utilisateur à la fois)."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.ilot = _ILOT_BY_URL.get(url, url)
+        self.lock = threading.RLock()
+        self.client = Client(url, timeout=OPCUA_TIMEOUT)
+        with measure(OPCUA_SECONDS, OPCUA_ERRORS, ilot=self.ilot, op="connect"):
+            self.client.connect()
+        self.last_used = time.monotonic()
+        self.closed = False
+        self.reused = False     # déjà prêtée ⇒ peut être morte sans le savoir
+        # cache propre à la session : Node résolus + VariantType découverts
+        self.nodes: dict[str, object] = {}
+        self.vtypes: dict[str, ua.VariantType] = {}
+        # image de l'automate : dernière valeur écrite / lue / notifiée par
+        # nœud (+ instant) ; repart à vide avec chaque nouvelle session
+        self.shadow: dict[str, tuple[Any, float]] = {}
+        self.monitored: set[str] = set()    # nœuds d'un abonnement actif
+
+    def remember(self, node_id: str, value) -> None:
+        self.shadow[node_id] = (value, time.monotonic())
+
+    def known(self, node_id: str, value) -> bool:
+        """
+        True si l'automate a sûrement déjà `value` : nœud surveillé par un
+        abonnement actif (toute modification nous est notifiée), ou valeur
+        connue depuis moins de OPCUA_SHADOW_TTL s. Sinon un autre client
+        (IHM / API) ou la logique automate a pu la changer.
+        """
+        entry = self.shadow.get(node_id)
+        if entry is None or not _same(entry[0], value):
+            return False
+        return node_id in self.monitored or time.monotonic() - entry[1] < OPCUA_SHADOW_TTL
+
+    def ping(self) -> None:
+        self.client.get_node(NODE_SERVER_STATE).get_value()
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+
+
+class SessionPool:
+    """
+    Sessions OPC UA persistantes, indexées par URL (donc par îlot).
+    ─ acquire()/release() : prêt exclusif de la session (thread-safe)
+    ─ thread de maintenance : ping périodique, reconnexion si le canal
+      est perdu, fermeture des sessions inactives depuis `idle_timeout`
+    """
+
+    def __init__(self, keepalive: float = OPCUA_KEEPALIVE,
+                 idle_timeout: float = OPCUA_IDLE_TIMEOUT,
+                 registry: HealthRegistry | None = None) -> None:
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+        self.health = registry or health
+        self._sessions: dict[str, _Session] = {}
+        self._connecting: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --- prêt / retour d'une session -------------------------------------
+    def acquire(self, url: str) -> _Session:
+        probe = self.health.before(url)     # îlot en quarantaine ⇒ échec immédiat
+        self._ensure_thread()
+        with self._lock:
+            conn_lock = self._connecting.setdefault(url, threading.Lock())
+        while True:
+            # un seul connect() simultané par endpoint
+            with conn_lock:
+                with self._lock:
+                    sess = self._sessions.get(url)
+                if sess is None:
+                    if not probe:               # ouvert pendant l'attente du verrou
+                        probe = self.health.before(url)
+                    try:
+                        sess = _Session(url)
+                    except Exception as e:
+                        if _channel_lost(e):
+                            self.health.failure(url, e)
+                        else:
+                            self.health.release_probe(url)
+                        raise
+                    with self._lock:
+                        self._sessions[url] = sess
+            sess.lock.acquire()
+            if not sess.closed:
+                return sess
+            sess.lock.release()     # fermée pendant l'attente : on recommence
+
+    def release(self, sess: _Session, broken: bool = False,
+                exc: BaseException | None = None) -> None:
+        """`exc` : erreur survenue pendant le prêt (bilan santé de l'endpoint)."""
+        sess.last_used = time.monotonic()
+        sess.reused = True
+        if exc is not None and _channel_lost(exc):
+            self.health.failure(sess.url, exc)
+        else:
+            self.health.success(sess.url)
+        if broken:
+            self._drop(sess)
+        sess.lock.release()
+
+    def _drop(self, sess: _Session) -> None:
+        with self._lock:
+            if self._sessions.get(sess.url) is sess:
+                del self._sessions[sess.url]
+        sess.close()
+
+    def close_all(self) -> None:
+        self._stop.set()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for sess in sessions:
+            sess.close()
+
+    # --- maintenance ------------------------------------------------------
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._maintain,
+                                                name="opcua-pool", daemon=True)
+                self._thread.start()
+
+    def _maintain(self) -> None:
+        while not self._stop.wait(self.keepalive):
+            with self._lock:
+                sessions = list(self._sessions.values())
+            for sess in sessions:
+                # session occupée ⇒ elle est vivante, on ne la dérange pas
+                if not sess.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if time.monotonic() - sess.last_used > self.idle_timeout:
+                        self._drop(sess)
+                        continue
+                    try:
+                        sess.ping()
+                    except Exception as e:
+                        print(f"[OPCUA] session perdue {sess.url} : {e}")
+                        self.health.failure(sess.url, e)
+                        self._drop(sess)
+                        self._reconnect(sess.url)
+                finally:
+                    sess.lock.release()
+
+    def _reconnect(self, url: str) -> None:
+        try:
+            self.health.before(url)
+        except CircuitOpenError:
+            return              # en quarantaine : la prochaine sonde s'en chargera
+        try:
+            new = _Session(url)
+        except Exception as e:
+            print(f"[OPCUA] reconnexion KO {url} : {e}")
+            self.health.failure(url, e)
+            return              # nouvel essai au prochain acquire()
+        self.health.success(url)
+        with self._lock:
+            if url in self._sessions:       # déjà recréée entre-temps
+                new.close()
+            else:
+                self._sessions[url] = new
+
+
+_pool = SessionPool()
+atexit.register(_pool.close_all)
+
 
 # -----------------------------------------------------------------------------
-# 3) Classe bas niveau : connexion + lecture / écriture
+# 4) Classe bas niveau : lecture / écriture sur une session du pool
 # -----------------------------------------------------------------------------
 class OPCUAHandler:
     """
@@ -59,142 +424,737 @@ class OPCUAHandler:
         with OPCUAHandler("LGN01") as plc:
             plc.write(NODE_START_ORDER, "WH/MO/00012")
             status = plc.read(NODE_STATE_MACHINE)
+
+    La session n'est pas fermée en sortie de bloc : elle retourne au pool
+    (et n'est jetée que si le canal OPC UA a été perdu).
     """
-    def __init__(self, key_or_url: str) -> None:
+    def __init__(self, key_or_url: str, pool: SessionPool | None = None) -> None:
         # clé (ex: "LGN01") ou URL complète
-        url = OPCUA_ENDPOINTS.get(key_or_url, key_or_url)
-        self._client = Client(url)
+        self.url = OPCUA_ENDPOINTS.get(key_or_url, key_or_url)
+        self._pool = pool or _pool
+        self._session: _Session | None = None
+        self.reused = False
 
     def __enter__(self) -> "OPCUAHandler":
-        self._client.connect()
+        self._session = self._pool.acquire(self.url)
+        self._client = self._session.client
+        self.reused = self._session.reused
         return self
 
-    def __exit__(self, *_exc) -> None:
-        self._client.disconnect()
+    def __exit__(self, _type, exc, _tb) -> None:
+        sess, self._session = self._session, None
+        self._pool.release(sess, broken=exc is not None and _channel_lost(exc), exc=exc)
+
+    def _measure(self, op: str):
+        return measure(OPCUA_SECONDS, OPCUA_ERRORS, ilot=self._session.ilot, op=op)
+
+    # --- cache Node / type (vidé à chaque nouvelle session) ----------------
+    def _node(self, node_id: str):
+        nodes = self._session.nodes
+        node = nodes.get(node_id)
+        if node is None:
+            node = nodes[node_id] = self._client.get_node(node_id)
+        return node
+
+    def _vtype(self, node_id: str) -> ua.VariantType:
+        vtypes = self._session.vtypes
+        if node_id not in vtypes:
+            with self._measure("read_type"):
+                vtypes[node_id] = self._node(node_id).get_data_type_as_variant_type()
+        return vtypes[node_id]
 
-    def write(self, node_id: str, value) -> None:
-        node = self._client.get_node(node_id)
+    def _prefetch_types(self, node_ids: list[str]) -> dict[str, ua.StatusCode]:
+        """
+        Types de plusieurs nœuds en UNE lecture de l'attribut DataType.
+        Retourne le StatusCode des nœuds refusés (ex. BadNodeIdUnknown).
+        """
+        vtypes = self._session.vtypes
+        missing = [n for n in dict.fromkeys(node_ids) if n not in vtypes]
+        bad: dict[str, ua.StatusCode] = {}
+        if not missing:
+            return bad
+        for node_id, dv in zip(missing, self._read_attribute(missing, ua.AttributeIds.DataType,
+                                                             "read_type")):
+            if not dv.StatusCode.is_good():
+                bad[node_id] = dv.StatusCode
+                continue
+            dtype = dv.Value.Value if dv.StatusCode.is_good() and dv.Value else None
+            # types de base (ns=0, id 1..25) = même numéro que VariantType ;
+            # types dérivés / énumérations : résolus par _vtype() à la demande
+            if (isinstance(dtype, ua.NodeId) and dtype.NamespaceIndex == 0
+                    and isinstance(dtype.Identifier, int) and 1 <= dtype.Identifier <= 25):
+                vtypes[node_id] = ua.VariantType(dtype.Identifier)
+        return bad
 
+    def _coerce(self, node_id: str, value) -> ua.Variant:
+        """Convertit une valeur JSON vers le type réel du nœud (métadonnées en cache)."""
+        vt = self._vtype(node_id)
+        try:
+            if vt == ua.VariantType.Boolean:
+                v = value if isinstance(value, bool) else str(value).strip().lower() in ("1", "true", "on")
+            elif vt in _INT_TYPES:
+                v = int(value)
+            elif vt in (ua.VariantType.Float, ua.VariantType.Double):
+                v = float(value)
+            elif vt == ua.VariantType.String:
+                v = str(value)
+            else:
+                return self._variant(node_id, value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"valeur invalide pour {node_id} ({vt.name}) : {value!r}") from e
+        return ua.Variant(v, vt)
+
+    def _variant(self, node_id: str, value) -> ua.Variant:
         # si on fournit déjà un Variant, on l’utilise tel quel
         if isinstance(value, ua.Variant):
-            node.set_value(value); return
+            return value
 
-        # sinon on adapte dynamiquement au type du nœud
-        dtype = node.get_data_type_as_variant_type()
+        # sinon on adapte au type du nœud (découvert une fois par session)
         if isinstance(value, str):
-            v = ua.Variant(value, ua.VariantType.String)
-        elif isinstance(value, bool):
-            v = ua.Variant(value, ua.VariantType.Boolean)
-        elif isinstance(value, int):
+            return ua.Variant(value, ua.VariantType.String)
+        if isinstance(value, bool):
+            return ua.Variant(value, ua.VariantType.Boolean)
+        if isinstance(value, int):
             # UInt16, Int16, Int32… suivant le PLC
-            v = ua.Variant(value, dtype if dtype.name.startswith("UInt") else ua.VariantType.Int32)
-        else:
-            v = ua.Variant(str(value), ua.VariantType.String)
-        node.set_value(v)
+            dtype = self._vtype(node_id)
+            return ua.Variant(value, dtype if dtype.name.startswith("UInt") else ua.VariantType.Int32)
+        return ua.Variant(str(value), ua.VariantType.String)
 
+    # --- écriture -----------------------------------------------------------
+    def write(self, node_id: str, value, force: bool = False) -> None:
+        self.write_many({node_id: value}, force=force)
+
+    def write_many(self, values: dict[str, object], coerce: bool = False,
+                   check: bool = True, force: bool | Iterable[str] = False) -> list:
+        """
+        Écrit plusieurs nœuds en UN seul service Write (un aller-retour).
+        Les nœuds dont l'automate a sûrement déjà la valeur (_Session.known)
+        sont sautés ; s'ils le sont tous, aucun aller-retour.
+        `coerce` : valeurs converties vers le type de chaque nœud (JSON / REST) ;
+                   un nœud inconnu reçoit son StatusCode, les autres sont écrits.
+        `check`  : lève ua.UaStatusCodeError si l'un des nœuds est refusé,
+                   sinon renvoie le StatusCode de chaque écriture (Good si sautée).
+        `force`  : True ⇒ tout réécrire ; ensemble de NodeIds ⇒ ceux-là seulement
+                   (bits dont la logique automate attend un front).
+        """
+        bad = self._prefetch_types(list(values)) if coerce else {}
+        variants = {}
+        for node_id, value in values.items():
+            if node_id in bad:
+                continue
+            if not coerce:
+                variants[node_id] = self._variant(node_id, value)
+                continue
+            try:
+                variants[node_id] = self._coerce(node_id, value)
+            except ua.UaStatusCodeError as e:    # type dérivé illisible : ce nœud seul
+                bad[node_id] = ua.StatusCode(e.code)
+        forced = set(values) if force is True else set(force or ())
+        sess = self._session
+        pending = {node_id: var for node_id, var in variants.items()
+                   if node_id in forced or not sess.known(node_id, var.Value)}
+
+        results = {node_id: bad.get(node_id, ua.StatusCode()) for node_id in values}
+        if pending:
+            params = ua.WriteParameters()
+            for node_id, var in pending.items():
+                wv = ua.WriteValue()
+                wv.NodeId = self._node(node_id).nodeid
+                wv.AttributeId = ua.AttributeIds.Value
+                wv.Value = ua.DataValue(var)
+                params.NodesToWrite.append(wv)
+            try:
+                with self._measure("write"):
+                    statuses = self._client.uaclient.write(params)
+            except Exception:
+                for node_id in pending:          # état automate inconnu
+                    sess.shadow.pop(node_id, None)
+                raise
+            for (node_id, var), status in zip(pending.items(), statuses):
+                results[node_id] = status
+                if status.is_good():
+                    sess.remember(node_id, var.Value)
+                else:
+                    sess.shadow.pop(node_id, None)
+        statuses = list(results.values())
+        if check:
+            for status in statuses:
+                status.check()
+        return statuses
 
     def read(self, node_id: str):
         """Renvoie la valeur brute du nœud."""
-        node = self._client.get_node(node_id)
-        return node.get_value()
+        with self._measure("read"):
+            value = self._node(node_id).get_value()
+        self._session.remember(node_id, value)
+        return value
+
+    def read_many(self, node_ids: list[str]) -> list:
+        """
+        Lit plusieurs nœuds en UN seul service Read.
+        Valeur brute par nœud, ou l'exception ua.UaStatusCodeError si refusé.
+        """
+        values = []
+        for node_id, dv in zip(node_ids, self._read_attribute(node_ids, ua.AttributeIds.Value)):
+            try:
+                dv.StatusCode.check()
+                values.append(dv.Value.Value)
+                self._session.remember(node_id, dv.Value.Value)
+            except ua.UaStatusCodeError as e:
+                values.append(e)
+        return values
+
+    def _read_attribute(self, node_ids: list[str], attribute, op: str = "read") -> list:
+        params = ua.ReadParameters()
+        for node_id in node_ids:
+            rv = ua.ReadValueId()
+            rv.NodeId = self._node(node_id).nodeid
+            rv.AttributeId = attribute
+            params.NodesToRead.append(rv)
+        with self._measure(op):
+            return self._client.uaclient.read(params)
+
+def with_plc(ilot: str, op: Callable[[OPCUAHandler], Any]) -> Any:
+    """
+    Exécute `op(plc)` sur la session de l'îlot. Une session réutilisée peut
+    être morte sans que le keepalive l'ait encore vu (PLC redémarré, coupure
+    réseau) : elle est alors jetée et `op` rejoué UNE fois sur une session
+    neuve. `op` doit donc être idempotent (lectures, écritures de valeurs).
+    """
+    plc = OPCUAHandler(ilot)
+    try:
+        with plc:
+            return op(plc)
+    except Exception as e:
+        if not (plc.reused and _channel_lost(e)):
+            raise
+        print(f"[OPCUA] session perdue sur {ilot}, nouvel essai : {e}")
+    with OPCUAHandler(ilot) as plc:
+        return op(plc)
+
+
+# -----------------------------------------------------------------------------
+# 5) Files de travail par îlot : un thread par PLC, exécution dans l'ordre
+# -----------------------------------------------------------------------------
+class IlotWorkers:
+    """
+    Une file FIFO (un thread) par îlot : les opérations soumises pour un même
+    PLC s'exécutent dans l'ordre de soumission, les îlots entre eux en parallèle.
+    """
+
+    def __init__(self) -> None:
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, ilot: str, fn: Callable, *args, **kwargs) -> Future:
+        with self._lock:
+            ex = self._executors.get(ilot)
+            if ex is None:
+                ex = self._executors[ilot] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"opcua-{ilot}")
+        return ex.submit(fn, *args, **kwargs)
+
+
+workers = IlotWorkers()
+
 
 # -----------------------------------------------------------------------------
-# 4) Fonctions haut niveau utilisées par l’IHM ou la REST
+# 6) Fonctions haut niveau utilisées par l’IHM ou la REST
 # -----------------------------------------------------------------------------
-def start_order(ilot: str, of_number: str) -> bool:
+# contexte de traçabilité : dernier OF / rôle écrits par îlot
+_last_of: dict[str, str] = {}
+_last_role: dict[str, int] = {}
+
+
+def _trace(action: str, ilot: str, t0: float, ok: bool, detail: str | None = None) -> None:
+    traceability.record(action, ilot=ilot, of=_last_of.get(ilot),
+                        role=_last_role.get(ilot), ok=ok, detail=detail,
+                        latency_ms=round((time.perf_counter() - t0) * 1000, 1))
+
+
+def start_order(ilot: str, of_number: str, force: bool = False) -> bool:
     """
     Écrit uniquement le numéro d’OF dans le tag StartOrder.
     Retourne True si succès, False sinon.
     """
     try:
-        with OPCUAHandler(ilot) as plc:
-            plc.write(NODE_START_ORDER, of_number)
+        with_plc(ilot, lambda plc: plc.write(NODE_START_ORDER, of_number, force=force))
         return True
     except Exception as e:
         print(f"[OPCUA] start_order KO sur {ilot}: {e}")
         return False
 
 
-def send_order_details(ilot: str, of_number: str, code: str, qty: float | int) -> bool:
-
+def send_order_details(ilot: str, of_number: str, code: str, qty: float | int,
+                       *, force: bool = False) -> bool:
+    """
+    Envoie OF + code article + quantité en une seule requête Write.
+    `force=True` réécrit aussi les valeurs que l'automate a déjà.
+    La validation (BP_Vld_OF_P4) est une impulsion : pulse_bit() après l'envoi
+    (cf. dispatch_order), jamais une simple mise à 1 qui resterait verrouillée.
+    """
+    t0 = time.perf_counter()
+    _last_of[ilot] = of_number
     try:
-        with OPCUAHandler(ilot) as plc:
-            # ▶ numéro OF : extraire les 5 derniers chiffres (ex: "WH/MO/00017" → 17)
-            of_id = int(of_number[-5:])
-
-            # ▶ code article : extraire chiffre entre parenthèses (ex: "Assemblage (27)" → 27)
-            import re
-            match = re.search(r"\((\d+)\)", code)
-            code_id = int(match.group(1)) if match else 0  # fallback = 0 si pas trouvé
+        # ▶ numéro OF : extraire les 5 derniers chiffres (ex: "WH/MO/00017" → 17)
+        of_id = int(of_number[-5:])
 
-            # ▶ quantité : forcer Int32
-            qty_int = int(qty)
+        # ▶ code article : extraire chiffre entre parenthèses (ex: "Assemblage (27)" → 27)
+        match = re.search(r"\((\d+)\)", code)
+        code_id = int(match.group(1)) if match else 0  # fallback = 0 si pas trouvé
 
-            # ▶ écrire dans les nœuds OPC-UA
-            plc.write(NODE_START_ORDER, of_id)
-            plc.write(NODE_ORDER_CODE, ua.Variant(code_id, ua.VariantType.UInt16))
-            plc.write(NODE_ORDER_QTY, qty_int)
-            # pas d'envoi de NODE_ORDER_DATE
+        # ▶ quantité : forcer Int32
+        qty_int = int(qty)
 
+        # ▶ écrire dans les nœuds OPC-UA (pas d'envoi de NODE_ORDER_DATE)
+        values = {
+            NODE_START_ORDER: of_id,
+            NODE_ORDER_CODE:  ua.Variant(code_id, ua.VariantType.UInt16),
+            NODE_ORDER_QTY:   qty_int,
+        }
 
+        # un OF renvoyé à l'identique ne réécrit rien (sauf force=True)
+        with_plc(ilot, lambda plc: plc.write_many(values, force=force))
+        _trace("send_order_details", ilot, t0, True, f"code={code_id} qty={qty_int}")
         return True
     except Exception as e:
         print(f"[OPCUA] send_order_details KO sur {ilot}: {e}")
+        _trace("send_order_details", ilot, t0, False, str(e))
         return False
 
 
 
-def get_states() -> dict[str, str]:
-    res: dict[str, str] = {}
-    for ilot, url in OPCUA_ENDPOINTS.items():
+_UNREADABLE = object()
+
+
+def read_state(ilot: str) -> str:
+    """
+    État d'un îlot : STOP / RUN / ALARM (NODE_STATE_MACHINE),
+    "ON" si connecté mais état illisible, "OFF" si injoignable.
+    """
+    def _read(plc: OPCUAHandler):
         try:
-            client = Client(url)
-            client.connect()
-            client.disconnect()
-            res[ilot] = "ON"
-        except Exception:
-            res[ilot] = "OFF"
-    return res
+            return plc.read(NODE_STATE_MACHINE)
+        except ua.UaStatusCodeError as e:
+            if _channel_lost(e):
+                raise
+            return _UNREADABLE
+
+    try:
+        value = with_plc(ilot, _read)
+        if value is _UNREADABLE:
+            return "ON"
+        return STATE_LABELS.get(value, str(value))
+    except Exception:
+        return "OFF"
+
+
+# threads dédiés aux sondes : une sonde bloquée ne retarde pas les autres
+_status_executor = ThreadPoolExecutor(max_workers=2 * len(OPCUA_ENDPOINTS),
+                                      thread_name_prefix="opcua-status")
+
+
+def get_states(timeout: float = OPCUA_STATUS_TIMEOUT) -> dict[str, str]:
+    """
+    Interroge tous les îlots en parallèle ; un îlot qui ne répond pas
+    dans `timeout` secondes est déclaré "OFF".
+    Durée totale ≈ îlot le plus lent (borné par `timeout`).
+    """
+    futures = {ilot: _status_executor.submit(read_state, ilot)
+               for ilot in OPCUA_ENDPOINTS}
+    wait(futures.values(), timeout=timeout)
+    return {ilot: fut.result() if fut.done() else "OFF"
+            for ilot, fut in futures.items()}
 
 
 
 
-def push_user(ilot: str, role: int) -> bool:
+def push_user(ilot: str, role: int, force: bool = False) -> bool:
     """
     Écrit 0 / 1 / 2 dans CurrentUserRole (UInt16).
+    Rôle inchangé (badge repassé) : aucune écriture, sauf `force=True`.
     """
+    t0 = time.perf_counter()
     try:
-        with OPCUAHandler(ilot) as plc:
-            plc.write(NODE_CURRENT_USER_ROLE,
-                      ua.Variant(role, ua.VariantType.UInt16))
+        with_plc(ilot, lambda plc: plc.write(NODE_CURRENT_USER_ROLE,
+                                             ua.Variant(role, ua.VariantType.UInt16),
+                                             force=force))
+        _last_role[ilot] = role
+        _trace("push_user", ilot, t0, True)
         return True
     except Exception as e:
         print(f"[OPCUA] push_user KO : {e}")
+        _trace("push_user", ilot, t0, False, f"role={role} {e}")
         return False
 
-def pulse_bit(ilot: str, node_id: str, duration: float = 1.0):
-    try:
-        with OPCUAHandler(ilot) as plc:
-            plc.write(node_id, True)      # 1
-            time.sleep(duration)
-            plc.write(node_id, False)     # 0
-        return True
-    except Exception as e:
-        print(f"[OPCUA] pulse_bit KO : {e}")
-        return False
+class _Pulse:
+    """Impulsion en cours sur un bit : rising → high → resetting."""
+    __slots__ = ("state", "deadline", "fut", "again")
+
+    def __init__(self, fut: Future) -> None:
+        self.state = "rising"
+        self.deadline: float | None = None
+        self.fut = fut
+        self.again: tuple[float, Future] | None = None   # relance demandée pendant la remise à 0
+
+
+class PulseScheduler:
+    """
+    Impulsions non bloquantes : le bit est mis à 1 tout de suite, la remise
+    à 0 est programmée ; un seul thread minuteur gère toutes les échéances
+    et confie les écritures à un petit pool (un PLC lent ne retarde pas
+    les autres). Une nouvelle impulsion sur un bit déjà à 1 repousse
+    simplement l'échéance (pas de front parasite) ; pendant la remise à 0,
+    elle est rejouée une fois le bit revenu à 0 (pas de 1 écrasé par un 0 tardif).
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, str, str]] = []   # (échéance, n°, ilot, node)
+        self._pending: dict[tuple[str, str], _Pulse] = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._writer = ThreadPoolExecutor(max_workers=len(OPCUA_ENDPOINTS),
+                                          thread_name_prefix="opcua-pulse")
+        self._thread: threading.Thread | None = None
+
+    def pulse(self, ilot: str, node_id: str, duration: float = 1.0) -> Future:
+        """
+        Future résolu à True quand le bit est revenu à 0,
+        False si la mise à 1 ou la remise à 0 a échoué.
+        """
+        key = (ilot, node_id)
+        with self._cond:
+            p = self._pending.get(key)
+            if p is not None and p.state != "resetting":
+                self._schedule(key, p, time.monotonic() + duration)
+                return p.fut
+            if p is not None:
+                if p.again is None:
+                    p.again = (duration, Future())
+                return p.again[1]
+            p = self._pending[key] = _Pulse(Future())    # réservé : mise à 1 en cours
+        self._rise(key, p, duration)
+        return p.fut
+
+    def _rise(self, key: tuple[str, str], p: _Pulse, duration: float) -> None:
+        ilot, node_id = key
+        try:
+            with_plc(ilot, lambda plc: plc.write(node_id, True, force=True))   # 1 (front voulu)
+        except Exception as e:
+            print(f"[OPCUA] pulse_bit KO : {e}")
+            with self._cond:
+                del self._pending[key]
+            p.fut.set_result(False)
+            return
+        with self._cond:
+            p.state = "high"
+            self._schedule(key, p, time.monotonic() + duration)
+
+    def _schedule(self, key: tuple[str, str], p: _Pulse, deadline: float) -> None:
+        # appelé verrou pris ; pendant la mise à 1, l'échéance est seulement notée
+        p.deadline = max(p.deadline or 0.0, deadline)
+        if p.state != "high":
+            return
+        self._seq += 1
+        heapq.heappush(self._heap, (p.deadline, self._seq, *key))
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="opcua-pulse-timer",
+                                            daemon=True)
+            self._thread.start()
+        self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                deadline, _, ilot, node_id = heapq.heappop(self._heap)
+                p = self._pending.get((ilot, node_id))
+                if p is None or p.state != "high" or p.deadline != deadline:
+                    continue                  # échéance repoussée entre-temps
+                p.state = "resetting"         # reste dans _pending jusqu'au 0 écrit
+            self._writer.submit(self._reset, (ilot, node_id), p)
+
+    def _reset(self, key: tuple[str, str], p: _Pulse) -> None:
+        ilot, node_id = key
+        try:
+            with_plc(ilot, lambda plc: plc.write(node_id, False, force=True))  # 0
+            ok = True
+        except Exception as e:
+            print(f"[OPCUA] pulse_bit KO (remise à 0) : {e}")
+            ok = False
+        with self._cond:
+            nxt = None
+            if p.again is not None:           # impulsion arrivée pendant la remise à 0
+                nxt = self._pending[key] = _Pulse(p.again[1])
+            else:
+                del self._pending[key]
+        p.fut.set_result(ok)
+        if nxt is not None:
+            self._rise(key, nxt, p.again[0])
+
+
+pulses = PulseScheduler()
+
+
+def schedule_pulse(ilot: str, node_id: str, duration: float = 1.0) -> Future:
+    """Impulsion non bloquante ; le Future indique le succès de la remise à 0."""
+    t0 = time.perf_counter()
+    fut = pulses.pulse(ilot, node_id, duration)
+    fut.add_done_callback(lambda f: _trace("pulse_bit", ilot, t0, f.result(), node_id))
+    return fut
+
+
+def pulse_bit(ilot: str, node_id: str, duration: float = 1.0, wait: bool = False) -> bool:
+    """
+    Met le bit à 1 et rend la main immédiatement (remise à 0 programmée).
+    `wait=True` : attend la fin de l'impulsion (ancien comportement).
+    """
+    fut = schedule_pulse(ilot, node_id, duration)
+    if wait or fut.done():
+        return fut.result()
+    return True
+# --- lecture / écriture groupée de tags quelconques (API REST) --------------
+def read_tags(ilot: str, node_ids: list[str]) -> dict[str, Any]:
+    """{NodeId: valeur | ua.UaStatusCodeError} en un seul service Read."""
+    check_node_ids(node_ids)
+    return dict(zip(node_ids, with_plc(ilot, lambda plc: plc.read_many(node_ids))))
+
+
+def write_tags(ilot: str, values: dict[str, Any], force: bool = False) -> dict[str, str]:
+    """
+    Écrit en un seul service Write, valeurs converties au type de chaque
+    nœud ; retourne {NodeId: nom du StatusCode} ("Good" si accepté).
+    Lève ValueError (NodeId mal formé, valeur non convertible) : rien n'est écrit.
+    """
+    check_node_ids(values)
+    statuses = with_plc(ilot, lambda plc: plc.write_many(values, coerce=True, check=False,
+                                                         force=force))
+    return {node_id: st.name for node_id, st in zip(values, statuses)}
+
+
+# --- diffusion sur plusieurs îlots -------------------------------------------
+def dispatch(ilots: list[str], fn: Callable[..., bool], *args,
+             timeout: float | None = None) -> dict[str, dict]:
+    """
+    Exécute `fn(ilot, *args)` sur chaque îlot via sa file (ordre préservé
+    par PLC, îlots en parallèle). Retourne par îlot :
+    {"ok": bool, "ms": durée d'exécution, "error": message si échec}.
+    """
+    def _timed(ilot: str) -> tuple[bool, float]:
+        t0 = time.perf_counter()
+        ok = fn(ilot, *args)
+        return bool(ok), round((time.perf_counter() - t0) * 1000, 1)
+
+    futures = {ilot: workers.submit(ilot, _timed, ilot) for ilot in dict.fromkeys(ilots)}
+    results: dict[str, dict] = {}
+    for ilot, fut in futures.items():
+        try:
+            ok, ms = fut.result(timeout)
+            results[ilot] = {"ok": ok, "ms": ms}
+        except Exception as e:
+            results[ilot] = {"ok": False, "ms": None, "error": str(e) or type(e).__name__}
+    return results
+
+
+def dispatch_order(ilots: list[str], of_number: str, code: str, qty: float | int,
+                   validate: bool = True) -> dict[str, dict]:
+    """Même OF sur plusieurs îlots ; `validate` ⇒ impulsion BP_Vld_OF_P4 après l'envoi."""
+    def _one(ilot: str) -> bool:
+        ok = send_order_details(ilot, of_number, code, qty)
+        if ok and validate:
+            ok = pulse_bit(ilot, NODE_VALIDATE_P4)
+        return ok
+    return dispatch(ilots, _one)
+
+
+def broadcast_user(ilots: list[str], role: int) -> dict[str, dict]:
+    """Même rôle utilisateur écrit sur plusieurs îlots."""
+    return dispatch(ilots, push_user, role)
+
+
+# -----------------------------------------------------------------------------
+# 7) Abonnements OPC UA (monitored items) → bus d'événements in-process
+# -----------------------------------------------------------------------------
+class DataChange(NamedTuple):
+    ilot: str
+    node_id: str
+    value: Any
+    timestamp: float
+
+
+class EventBus:
+    """
+    Diffusion des changements de valeur aux consommateurs du process.
+    Les callbacks sont appelés dans le thread de l'abonnement OPC UA :
+    ils doivent rester brefs (mise à jour d'un cache, d'une file…).
+    """
+
+    def __init__(self) -> None:
+        self._listeners: list[tuple[Callable[[DataChange], None], str | None, str | None]] = []
+        self._last: dict[tuple[str, str], DataChange] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[DataChange], None],
+                  ilot: str | None = None, node_id: str | None = None) -> None:
+        """`ilot` / `node_id` à None = tous."""
+        with self._lock:
+            self._listeners.append((callback, ilot, node_id))
+
+    def unsubscribe(self, callback: Callable[[DataChange], None]) -> None:
+        with self._lock:
+            self._listeners = [l for l in self._listeners if l[0] is not callback]
+
+    def publish(self, evt: DataChange) -> None:
+        with self._lock:
+            self._last[(evt.ilot, evt.node_id)] = evt
+            listeners = list(self._listeners)
+        for callback, ilot, node_id in listeners:
+            if (ilot is None or ilot == evt.ilot) and (node_id is None or node_id == evt.node_id):
+                try:
+                    callback(evt)
+                except Exception as e:
+                    print(f"[OPCUA] listener KO : {e}")
+
+    def last(self, ilot: str, node_id: str) -> DataChange | None:
+        """Dernière valeur notifiée (None si jamais reçue)."""
+        with self._lock:
+            return self._last.get((ilot, node_id))
+
+
+class _DataChangeHandler:
+    """Handler freeopcua : traduit les notifications en DataChange."""
+
+    def __init__(self, ilot: str, bus: EventBus, names: dict,
+                 session: _Session | None = None) -> None:
+        self.ilot, self._bus, self._names = ilot, bus, names
+        self._session = session
+
+    def datachange_notification(self, node, val, _data) -> None:
+        node_id = self._names.get(node.nodeid, node.nodeid.to_string())
+        if self._session is not None:
+            self._session.remember(node_id, val)     # image automate tenue à jour
+            self._session.monitored.add(node_id)
+        self._bus.publish(DataChange(self.ilot, node_id, val, time.time()))
+
+    def status_change_notification(self, status) -> None:
+        print(f"[OPCUA] abonnement {self.ilot} : {status}")
+        if self._session is not None:
+            self._session.monitored = set()          # image plus garantie
+
+
+class SubscriptionManager:
+    """
+    Abonnements par îlot sur les sessions du pool.
+    Un thread de supervision (re)crée l'abonnement quand la session change
+    (reconnexion) ou qu'il a échoué, et garde la session active dans le pool.
+
+        subscriptions.watch("LGN01", [NODE_STATE_MACHINE])
+        subscriptions.start()
+        bus.subscribe(callback, node_id=NODE_STATE_MACHINE)
+    """
+
+    def __init__(self, bus: EventBus, period_ms: int = OPCUA_SUB_PERIOD_MS,
+                 pool: SessionPool | None = None) -> None:
+        self.bus = bus
+        self.period_ms = period_ms
+        self._pool = pool or _pool
+        self._watched: dict[str, list[str]] = {}
+        self._active: dict[str, tuple[_Session, Any]] = {}   # ilot -> (session, subscription)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def watch(self, ilot: str, node_ids: list[str]) -> None:
+        with self._lock:
+            known = self._watched.setdefault(ilot, [])
+            known.extend(n for n in node_ids if n not in known)
+            old = self._active.pop(ilot, None)     # ⇒ recréé avec la nouvelle liste
+        if old is not None:
+            old[0].monitored = set()
+            try:
+                old[1].delete()
+            except Exception:
+                pass
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="opcua-subscriptions",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._lock:
+            active, self._active = self._active, {}
+        for sess, sub in active.values():
+            sess.monitored = set()
+            try:
+                sub.delete()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                watched = dict(self._watched)
+            for ilot, node_ids in watched.items():
+                try:
+                    self._ensure(ilot, node_ids)
+                except CircuitOpenError:
+                    pass                # îlot en quarantaine : rien à journaliser
+                except Exception as e:
+                    print(f"[OPCUA] abonnement KO sur {ilot}: {e}")
+            self._stop.wait(OPCUA_KEEPALIVE)
+
+    def _ensure(self, ilot: str, node_ids: list[str]) -> None:
+        url = OPCUA_ENDPOINTS.get(ilot, ilot)
+        sess = self._pool.acquire(url)
+        broken, error = False, None
+        try:
+            with self._lock:
+                current = self._active.get(ilot)
+            if current is not None and current[0] is sess:
+                return
+            nodes = [sess.client.get_node(n) for n in node_ids]
+            handler = _DataChangeHandler(ilot, self.bus,
+                                         {nd.nodeid: n for nd, n in zip(nodes, node_ids)},
+                                         sess)
+            sub = sess.client.create_subscription(self.period_ms, handler)
+            try:
+                sub.subscribe_data_change(nodes)
+            except Exception:
+                sub.delete()
+                raise
+            with self._lock:
+                self._active[ilot] = (sess, sub)
+        except Exception as e:
+            broken, error = _channel_lost(e), e
+            raise
+        finally:
+            self._pool.release(sess, broken=broken, exc=error)
+
+
+bus = EventBus()
+subscriptions = SubscriptionManager(bus)
+
+
 # -----------------------------------------------------------------------------
-# 5) Petit test local
+# 8) Petit test local
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
     import sys, pprint
     # usage: python3 opcua_client.py start LGN02 WH/MO/00012
-    #        python3 opcua_client.py send LGN02 WH/MO/00012 Code 1 2025-04-29T13:00:00
+    #        python3 opcua_client.py send LGN02 WH/MO/00012 "Assemblage (27)" 1
     if len(sys.argv) >= 3 and sys.argv[1] == "start":
         _, _, ilot, ofn = sys.argv
         print("→ start_order :", start_order(ilot, ofn))
-    elif len(sys.argv) == 7 and sys.argv[1] == "send":
-        _, _, ilot, ofn, code, qty, date = sys.argv
-        ok = send_order_details(ilot, ofn, code, float(qty), date)
+    elif len(sys.argv) in (6, 7) and sys.argv[1] == "send":
+        # une date en 7e argument est ignorée (NODE_ORDER_DATE n'est pas envoyé)
+        ilot, ofn, code, qty = sys.argv[2:6]
+        ok = send_order_details(ilot, ofn, code, float(qty))
         print("→ send_order_details :", ok)
     else:
         pprint.pp(get_states())
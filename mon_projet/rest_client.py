@@ -1,6 +1,7 @@
 # rest_client.py ───────────────────────────────────────────────
 import requests, json, pathlib
-import os
+import os, threading, time, datetime
+from requests.adapters import HTTPAdapter
 from opcua_client import send_order_details
 from opcua_client import pulse_bit, NODE_VALIDATE_P4
 
@@ -8,45 +9,112 @@ from opcua_client import pulse_bit, NODE_VALIDATE_P4
 API = os.getenv("LGN_API", "http://127.0.0.1:5000/api")  # ← IP du Pi + port exposé
 CACHE    = pathlib.Path("/tmp/of_cache.json")
 TIMEOUT  = 3
+OF_TTL   = float(os.getenv("LGN_OF_TTL", "5"))   # s avant revalidation de la liste OF
+
+# session HTTP partagée : connexions keep-alive réutilisées (thread-safe)
+_session = requests.Session()
+_session.mount("http://",  HTTPAdapter(pool_connections=2, pool_maxsize=8))
+_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=8))
 
 # --- helpers -------------------------------------------------- #
-def _get(url):
-    r = requests.get(f"{API}{url}", timeout=TIMEOUT); r.raise_for_status()
+def _get(url, params=None):
+    r = _session.get(f"{API}{url}", params=params, timeout=TIMEOUT); r.raise_for_status()
     return r.json()
 
 def _post(url, payload=None):
-    r = requests.post(f"{API}{url}", json=payload, timeout=TIMEOUT)
+    r = _session.post(f"{API}{url}", json=payload, timeout=TIMEOUT)
     return r
 
-# --- liste OF (avec cache) ----------------------------------- #
-def get_of_list_cached():
+# --- liste OF (cache stale-while-revalidate) ------------------ #
+_of = {"data": None, "etag": None, "at": 0.0}    # mémoire ; "at" = dernière validation
+_of_lock = threading.Lock()
+_of_refresh = threading.Lock()                   # une seule revalidation à la fois
+
+def _load_disk_cache():
     try:
-        data = _get("/orders")["orders"]
-        CACHE.write_text(json.dumps(data)); return data
-    except Exception as e:
-        print("[REST] fallback cache:", e)
-        return json.loads(CACHE.read_text()) if CACHE.exists() else []
+        _of["data"] = json.loads(CACHE.read_text())
+    except Exception:
+        _of["data"] = None
+
+def _write_disk_cache(data):
+    """Écriture atomique (fichier temporaire + rename)."""
+    tmp = CACHE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data)); os.replace(tmp, CACHE)
+
+def _revalidate():
+    """GET /orders conditionnel (If-None-Match) ; disque réécrit seulement si la liste change."""
+    with _of_refresh:
+        with _of_lock:
+            data, etag = _of["data"], _of["etag"]
+        headers = {"If-None-Match": etag} if etag and data is not None else {}
+        r = _session.get(f"{API}/orders", headers=headers, timeout=TIMEOUT)
+        if r.status_code == 304:
+            with _of_lock: _of["at"] = time.monotonic()
+            return data
+        r.raise_for_status()
+        new = r.json()["orders"]
+        with _of_lock:
+            _of.update(data=new, etag=r.headers.get("ETag"), at=time.monotonic())
+        if new != data:
+            _write_disk_cache(new)
+        return new
+
+def _revalidate_bg():
+    if _of_refresh.locked(): return
+    def run():
+        try: _revalidate()
+        except Exception as e: print("[REST] revalidation KO:", e)
+    threading.Thread(target=run, daemon=True).start()
+
+def get_of_list_cached(max_age=OF_TTL):
+    """
+    Liste OF servie depuis la mémoire (ou le fichier au démarrage) :
+    ─ fraîche (< max_age)  → retournée telle quelle
+    ─ périmée              → retournée tout de suite + revalidation en fond
+    ─ aucune copie         → appel réseau synchrone
+    """
+    with _of_lock:
+        if _of["data"] is None and _of["at"] == 0.0 and CACHE.exists():
+            _load_disk_cache()
+        data, age = _of["data"], time.monotonic() - _of["at"]
+    if data is None:
+        try:
+            return _revalidate()
+        except Exception as e:
+            print("[REST] liste OF indisponible:", e)
+            return []
+    if age > max_age:
+        _revalidate_bg()
+    return data
 
 # --- composants ---------------------------------------------- #
 def get_of_components(of_num):
     return _get(f"/orders/components?of_name={of_num}")["components"]
 
+def get_of_components_batch(of_nums):
+    """{numero OF: [composants]} pour toute une liste, en une requête."""
+    r = _post("/orders/components", {"of_names": list(of_nums)}); r.raise_for_status()
+    return r.json()["components"]
+
+# --- traçabilité (base de l'API : envois IHM + REST) ---------- #
+def get_traceability(of=None, ilot=None, since=None, cursor=None, limit=100):
+    """Page {"events", "next_cursor"} de /traceability ; `since` en epoch."""
+    params = {"of": of, "ilot": ilot, "cursor": cursor, "limit": limit,
+              "since": datetime.datetime.fromtimestamp(since).isoformat() if since else None}
+    return _get("/traceability", {k: v for k, v in params.items() if v is not None})
+
 # --- statut des îlots ---------------------------------------- #
 def status():
     return _get("/status")["ilots"]
 
 # --- démarrer un OF ------------------------------------------ #
-def start(ilot, of_number, code, qty, date_str):
-    print(f"[DEBUG] Envoi OF: ilot={ilot}, of={of_number}, code={code}, qty={qty}, date={date_str}")
-    return send_order_details(ilot, of_number, code, qty, date_str)
-
 def start(ilot, of_number, code, qty):
     print(f"[DEBUG] Envoi OF: ilot={ilot}, of={of_number}, code={code}, qty={qty}")
 
     ok = send_order_details(ilot, of_number, code, qty)
 
     if ok:
-        pulse_bit(ilot, NODE_VALIDATE_P4)  # ⚡ impulsion de 1s
+        pulse_bit(ilot, NODE_VALIDATE_P4)  # ⚡ impulsion de 1s (non bloquante)
     return ok
 
 
@@ -1,7 +1,15 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, make_response
 import datetime
 import odoo_client as oc
+import time
 from opcua_client import start_order as opcua_start, get_states, send_order_details
+from opcua_client import OPCUA_ENDPOINTS, dispatch_order, broadcast_user, read_tags, write_tags
+from opcua_client import health
+from status_poller import poller
+import traceability
+from historian import historian
+import metrics
+from api_cache import cached, invalidate
 
 api_routes = Blueprint("api_routes", __name__)
 
@@ -9,14 +17,53 @@ api_routes = Blueprint("api_routes", __name__)
 def test():
     return jsonify({"message": "Hello from the NEE-202504 API REST!"})
 
+ORDER_FILTERS = ("state", "product", "date_from", "date_to", "name", "cursor", "limit")
+MAX_PAGE = 500
+
 @api_routes.route("/orders", methods=["GET"])
 def list_orders():
     """
-    Retourne la liste des ordres de fabrication depuis Odoo.
+    Retourne la liste des ordres de fabrication (index local synchronisé
+    avec Odoo). Requête conditionnelle : If-None-Match → 304 si inchangée.
+
+    Filtres (poussés dans le domaine Odoo) : state (répétable ou "a,b"),
+    product, date_from, date_to, name (préfixe) ; pagination : cursor, limit.
+    Réponse filtrée : {"orders", "total", "next_cursor"}.
     """
+    if any(k in request.args for k in ORDER_FILTERS):
+        return _search_orders()
+    try:
+        orders, etag = cached("orders", (), oc.list_orders_etag)
+        if request.if_none_match.contains(etag):
+            resp = make_response("", 304)
+        else:
+            resp = jsonify({"orders": orders})
+        resp.set_etag(etag)
+        return resp
+    except Exception as e:
+        return jsonify({"error": f"Impossible de lister les OF : {e}"}), 500
+
+def _search_orders():
+    args = request.args
+    states = [s for v in args.getlist("state") for s in v.split(",") if s]
     try:
-        orders = oc.list_orders()
-        return jsonify({"orders": orders})
+        cursor = int(args["cursor"]) if args.get("cursor") else None
+        limit = min(int(args.get("limit", 50)), MAX_PAGE)
+    except ValueError:
+        return jsonify({"error": "cursor et limit doivent être des entiers"}), 400
+    if limit <= 0:
+        return jsonify({"error": "limit doit être positif"}), 400
+    try:
+        filters = dict(state=states or None,
+                       product=args.get("product"),
+                       date_from=args.get("date_from"),
+                       date_to=args.get("date_to"),
+                       name_prefix=args.get("name"),
+                       cursor=cursor, limit=limit)
+        key = tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                           for k, v in filters.items()))
+        page = cached("search", key, lambda: oc.search_orders(**filters))
+        return jsonify(page)
     except Exception as e:
         return jsonify({"error": f"Impossible de lister les OF : {e}"}), 500
 
@@ -30,37 +77,217 @@ def list_components():
     if not of_name:
         return jsonify({"error": "paramètre of_name manquant"}), 400
     try:
-        components = oc.list_components(of_name)
+        components = cached("components", of_name,
+                            lambda: oc.list_components(of_name))
         return jsonify({"components": components})
     except Exception as e:
         return jsonify({"error": f"Erreur récupération composants : {e}"}), 500
 
+@api_routes.route("/orders/components", methods=["POST"])
+def list_components_batch():
+    """
+    Composants de plusieurs OF en un appel.
+    Corps JSON : {"of_names": ["WH/MO/00012", ...]}
+    Réponse : {"components": {"WH/MO/00012": [...], ...}}
+    """
+    of_names = (request.get_json(silent=True) or {}).get("of_names")
+    if not isinstance(of_names, list) or not all(isinstance(n, str) for n in of_names):
+        return jsonify({"error": "of_names (liste de noms d'OF) obligatoire"}), 400
+    try:
+        comps = cached("components", tuple(of_names),
+                       lambda: oc.list_components_batch(of_names))
+        return jsonify({"components": comps})
+    except Exception as e:
+        return jsonify({"error": f"Erreur récupération composants : {e}"}), 500
+
 @api_routes.route("/orders/<path:of_num>/start", methods=["POST"])
 def start_order_route(of_num):
     data = request.get_json() or {}
     ilot    = data.get("ilot")
     code    = data.get("code")
     qty     = data.get("quantity")
-    # si pas de date fournie, on prend maintenant
-    date_str = data.get("date") or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # validation rapide
     if not all([ilot, code, qty]):
         return jsonify({"error":"ilot, code et quantity sont obligatoires"}), 400
 
-    if send_order_details(ilot, of_num, code, qty, date_str):
+    ok = send_order_details(ilot, of_num, code, qty)
+    invalidate("orders", "search", "status")
+    if ok:
         return jsonify({"status":"started","ilot":ilot,"order":of_num}), 200
     else:
         return jsonify({"error":f"Échec envoi OF {of_num} sur {ilot}"}), 500
 
+def _ilots_arg(data):
+    """Liste d'îlots validée (None si absente / inconnue)."""
+    ilots = data.get("ilots")
+    if not isinstance(ilots, list) or not ilots or not all(i in OPCUA_ENDPOINTS for i in ilots):
+        return None
+    return ilots
+
+@api_routes.route("/orders/<path:of_num>/dispatch", methods=["POST"])
+def dispatch_order_route(of_num):
+    """
+    Envoie un OF sur plusieurs îlots en parallèle.
+    Corps JSON : {"ilots": ["LGN01", ...], "code", "quantity", "validate": true}
+    Réponse : résultat + durée (ms) par îlot, durée totale.
+    """
+    data = request.get_json(silent=True) or {}
+    ilots = _ilots_arg(data)
+    code, qty = data.get("code"), data.get("quantity")
+    if ilots is None or not all([code, qty]):
+        return jsonify({"error": f"ilots (parmi {list(OPCUA_ENDPOINTS)}), code et quantity sont obligatoires"}), 400
+
+    t0 = time.perf_counter()
+    results = dispatch_order(ilots, of_num, code, qty, bool(data.get("validate", True)))
+    invalidate("orders", "search", "status")
+    body = {"order": of_num, "results": results,
+            "ms": round((time.perf_counter() - t0) * 1000, 1)}
+    return jsonify(body), 200 if all(r["ok"] for r in results.values()) else 500
+
+@api_routes.route("/ilots/role", methods=["POST"])
+def broadcast_role_route():
+    """
+    Écrit le rôle utilisateur sur plusieurs îlots en parallèle.
+    Corps JSON : {"ilots": ["LGN01", ...], "role": 0|1|2}
+    """
+    data = request.get_json(silent=True) or {}
+    ilots, role = _ilots_arg(data), data.get("role")
+    if ilots is None or role not in (0, 1, 2):
+        return jsonify({"error": "ilots et role (0, 1 ou 2) sont obligatoires"}), 400
+
+    t0 = time.perf_counter()
+    results = broadcast_user(ilots, role)
+    body = {"role": role, "results": results,
+            "ms": round((time.perf_counter() - t0) * 1000, 1)}
+    return jsonify(body), 200 if all(r["ok"] for r in results.values()) else 500
+
 @api_routes.route("/status", methods=["GET"])
 def status_route():
     """
-    Retourne l'état courant des îlots via OPC-UA.
+    Retourne l'état des îlots depuis l'instantané du collecteur
+    (champ `age` = ancienneté en s). Interrogation directe OPC-UA
+    uniquement tant que le collecteur n'a encore rien relevé.
+    Champ `circuit` : état du disjoncteur de l'îlot (closed / open / half_open).
     """
     try:
-        states = get_states()
-        ilots = [{"ilot": k, "etat": v} for k, v in states.items()]
+        ilots = poller.snapshot()
+        if not ilots:
+            states = cached("status", (), get_states)
+            ilots = [{"ilot": k, "etat": v} for k, v in states.items()]
+        circuits = health.snapshot()
+        for entry in ilots:
+            entry["circuit"] = circuits.get(entry["ilot"], {"state": "closed", "failures": 0})
         return jsonify({"ilots": ilots})
     except Exception as e:
         return jsonify({"error": f"Impossible de récupérer le statut : {e}"}), 500
+
+@api_routes.route("/traceability", methods=["GET"])
+def traceability_route():
+    """
+    Historique des envois automates, du plus récent au plus ancien.
+    Paramètres : of, ilot, since / until (ISO 8601), cursor, limit.
+    """
+    args = request.args
+    try:
+        since = datetime.datetime.fromisoformat(args["since"]).timestamp() if args.get("since") else None
+        until = datetime.datetime.fromisoformat(args["until"]).timestamp() if args.get("until") else None
+        cursor = int(args["cursor"]) if args.get("cursor") else None
+        limit = min(int(args.get("limit", 100)), MAX_PAGE)
+    except ValueError:
+        return jsonify({"error": "since/until (ISO 8601), cursor et limit (entiers) invalides"}), 400
+    try:
+        page = traceability.store.query(of=args.get("of"), ilot=args.get("ilot"),
+                                        since=since, until=until,
+                                        cursor=cursor, limit=max(limit, 1))
+        return jsonify(page)
+    except Exception as e:
+        return jsonify({"error": f"Impossible de lire la traçabilité : {e}"}), 500
+
+def _time_arg(value, default):
+    """Horodatage : secondes epoch ou ISO 8601."""
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+
+@api_routes.route("/history", methods=["GET"])
+def history_route():
+    """
+    Série sous-échantillonnée d'un tag : min / max / dernière valeur par intervalle.
+    Paramètres : ilot, tag (state, of, code, qty), start / end (epoch ou ISO,
+    défaut : dernière heure), buckets (défaut 120).
+    """
+    args = request.args
+    series = historian.series(args.get("ilot", ""), args.get("tag", "state"))
+    if series is None:
+        return jsonify({"error": f"ilot parmi {list(OPCUA_ENDPOINTS)}, tag parmi {list(historian.tags)}"}), 400
+    try:
+        end = _time_arg(args.get("end"), time.time())
+        start = _time_arg(args.get("start"), end - 3600)
+        buckets = min(int(args.get("buckets", 120)), 2000)
+    except ValueError:
+        return jsonify({"error": "start/end (epoch ou ISO 8601) ou buckets invalides"}), 400
+    if end <= start or buckets <= 0:
+        return jsonify({"error": "fenêtre ou buckets invalides"}), 400
+    return jsonify({"ilot": args["ilot"], "tag": args.get("tag", "state"),
+                    "start": start, "end": end,
+                    "points": series.downsample(start, end, buckets)})
+
+MAX_TAGS = 200
+
+def _tag_value(value):
+    """Valeur OPC-UA → JSON ; erreur par nœud → {"error": ...}."""
+    if isinstance(value, Exception):
+        return {"error": str(value)}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_tag_value(v) for v in value]
+    return str(value)
+
+@api_routes.route("/ilots/<ilot>/tags", methods=["GET"])
+def read_tags_route(ilot):
+    """
+    Lit plusieurs tags d'un îlot en un seul aller-retour OPC-UA.
+    Paramètre : node (un NodeId par occurrence, répétable ; pas de découpage
+    sur "," : les NodeIds chaîne peuvent en contenir).
+    """
+    nodes = [n for n in request.args.getlist("node") if n]
+    if ilot not in OPCUA_ENDPOINTS or not nodes or len(nodes) > MAX_TAGS:
+        return jsonify({"error": f"ilot parmi {list(OPCUA_ENDPOINTS)} et 1 à {MAX_TAGS} node"}), 400
+    try:
+        values = read_tags(ilot, nodes)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Lecture {ilot} impossible : {e}"}), 500
+    return jsonify({"ilot": ilot, "values": {n: _tag_value(v) for n, v in values.items()}})
+
+@api_routes.route("/ilots/<ilot>/tags", methods=["POST"])
+def write_tags_route(ilot):
+    """
+    Écrit plusieurs tags d'un îlot en un seul aller-retour OPC-UA,
+    valeurs converties au type de chaque nœud ; celles que l'automate a
+    déjà ne sont pas réécrites, sauf "force": true.
+    Corps JSON : {"values": {"ns=2;s=...": valeur, ...}, "force": false}
+    """
+    data = request.get_json(silent=True) or {}
+    values = data.get("values")
+    if ilot not in OPCUA_ENDPOINTS or not isinstance(values, dict) or not 0 < len(values) <= MAX_TAGS:
+        return jsonify({"error": f"ilot parmi {list(OPCUA_ENDPOINTS)} et values (1 à {MAX_TAGS} tags) obligatoires"}), 400
+    try:
+        results = write_tags(ilot, values, force=bool(data.get("force")))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Écriture {ilot} impossible : {e}"}), 500
+    ok = all(r == "Good" for r in results.values())
+    return jsonify({"ilot": ilot, "ok": ok, "results": results}), 200 if ok else 207
+
+@api_routes.route("/metrics", methods=["GET"])
+def metrics_route():
+    """Compteurs et histogrammes de latence (format texte Prometheus)."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
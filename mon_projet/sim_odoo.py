@@ -0,0 +1,174 @@
+# sim_odoo.py ─────────────────────────────────────────────────────
+"""
+Faux serveur Odoo XML-RPC (/xmlrpc/2/common + /xmlrpc/2/object) pour
+tests et bench, sans ERP.
+─ fixtures générées : `orders` mrp.production, leurs mrp.bom et stock.move
+─ search / search_read / search_count / read avec domaines simples
+  (=, !=, in, <, <=, >, >=, ilike, =like), limit / order "id desc"
+─ latence injectée par appel, `churn` : OF modifiés par seconde (write_date)
+
+    python3 sim_odoo.py --port 8069 --orders 5000 --latency 0.02
+    → ODOO_URL=http://127.0.0.1:8069
+"""
+
+from __future__ import annotations
+import fnmatch
+import operator
+import random
+import threading
+import time
+from socketserver import ThreadingMixIn
+from xmlrpc.server import MultiPathXMLRPCServer, SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler
+
+STATES = ["draft", "confirmed", "progress", "to_close", "done", "cancel"]
+UID = 2
+_OPS = {"=": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+        ">": operator.gt, ">=": operator.ge}
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+class FakeOdoo:
+    def __init__(self, orders: int = 100, boms: int = 20, moves_per_order: int = 3,
+                 latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        ts = _now()
+        self.tables: dict[str, dict[int, dict]] = {
+            "mrp.bom": {b: {"id": b, "code": f"{b}"} for b in range(1, boms + 1)},
+            "stock.move": {},
+            "mrp.production": {},
+        }
+        move_id = 0
+        for i in range(1, orders + 1):
+            moves = []
+            for _ in range(moves_per_order):
+                move_id += 1
+                pid = random.randint(100, 199)
+                self.tables["stock.move"][move_id] = {
+                    "id": move_id, "product_id": [pid, f"Composant {pid}"],
+                    "product_uom_qty": float(random.randint(1, 10))}
+                moves.append(move_id)
+            bom = random.randint(1, boms)
+            self.tables["mrp.production"][i] = {
+                "id": i, "name": f"WH/MO/{i:05d}",
+                "product_id": [bom, f"Assemblage {bom}"],
+                "product_qty": float(random.randint(1, 20)),
+                "state": random.choice(STATES),
+                "bom_id": [bom, f"BOM {bom}"],
+                "move_raw_ids": moves,
+                "date_planned_start": ts, "write_date": ts,
+            }
+
+    # --- services XML-RPC ------------------------------------------- #
+    def authenticate(self, db, login, password, ctx):
+        self._tick()
+        return UID
+
+    def execute_kw(self, db, uid, password, model, method, args, kw=None):
+        self._tick()
+        kw = kw or {}
+        table = self.tables[model]
+        with self._lock:
+            if method == "read":
+                ids = args[0] if isinstance(args[0], list) else [args[0]]
+                return [self._fields(table[i], kw.get("fields")) for i in ids if i in table]
+            recs = [r for r in table.values() if self._match(r, args[0] if args else [])]
+            if method == "search_count":
+                return len(recs)
+            recs.sort(key=lambda r: r["id"], reverse="desc" in kw.get("order", ""))
+            recs = recs[kw.get("offset", 0):]
+            if kw.get("limit"):
+                recs = recs[:kw["limit"]]
+            if method == "search":
+                return [r["id"] for r in recs]
+            if method == "search_read":
+                return [self._fields(r, kw.get("fields")) for r in recs]
+        raise ValueError(f"méthode non simulée : {model}.{method}")
+
+    def touch(self, n: int = 1) -> None:
+        """Modifie `n` OF au hasard (état + write_date) – simule l'activité Odoo."""
+        with self._lock:
+            orders = self.tables["mrp.production"]
+            for i in random.sample(list(orders), min(n, len(orders))):
+                orders[i]["state"] = random.choice(STATES)
+                orders[i]["write_date"] = _now()
+
+    # --- utilitaires ------------------------------------------------ #
+    def _tick(self) -> None:
+        self.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _fields(rec: dict, fields) -> dict:
+        if not fields:
+            return dict(rec)
+        return {"id": rec["id"], **{f: rec.get(f, False) for f in fields}}
+
+    @staticmethod
+    def _match(rec: dict, domain: list) -> bool:
+        for field, op, value in domain:
+            v = rec.get(field)
+            many2one = isinstance(v, list) and len(v) == 2 and isinstance(v[1], str)
+            if op == "ilike":
+                ok = str(value).lower() in str(v[1] if many2one else v).lower()
+            elif op == "=like":
+                ok = fnmatch.fnmatchcase(str(v), str(value).replace("%", "*").replace("_", "?"))
+            elif op == "in":
+                ok = (v[0] if many2one else v) in value
+            else:
+                ok = _OPS[op](v[0] if many2one else v, value)
+            if not ok:
+                return False
+        return True
+
+
+class _Server(ThreadingMixIn, MultiPathXMLRPCServer):
+    daemon_threads = True
+
+
+def serve(odoo: FakeOdoo, port: int = 0) -> tuple[_Server, str]:
+    """Démarre le serveur dans un thread ; retourne (serveur, ODOO_URL)."""
+
+    class Handler(SimpleXMLRPCRequestHandler):
+        rpc_paths = ("/xmlrpc/2/common", "/xmlrpc/2/object")
+        protocol_version = "HTTP/1.1"              # keep-alive comme Odoo
+
+        def log_message(self, *_):
+            pass
+
+    server = _Server(("127.0.0.1", port), requestHandler=Handler,
+                     allow_none=True, logRequests=False)
+    common = SimpleXMLRPCDispatcher(allow_none=True)
+    common.register_function(odoo.authenticate, "authenticate")
+    obj = SimpleXMLRPCDispatcher(allow_none=True)
+    obj.register_function(odoo.execute_kw, "execute_kw")
+    server.add_dispatcher("/xmlrpc/2/common", common)
+    server.add_dispatcher("/xmlrpc/2/object", obj)
+    threading.Thread(target=server.serve_forever, name="sim-odoo", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--port", type=int, default=8069)
+    p.add_argument("--orders", type=int, default=100)
+    p.add_argument("--latency", type=float, default=0.0, help="s par appel")
+    p.add_argument("--churn", type=int, default=0, help="OF modifiés par seconde")
+    a = p.parse_args()
+
+    odoo = FakeOdoo(orders=a.orders, latency=a.latency)
+    _, url = serve(odoo, a.port)
+    print(f"ODOO_URL={url}")
+    try:
+        while True:
+            time.sleep(1)
+            if a.churn:
+                odoo.touch(a.churn)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,108 @@
+# sim_opcua.py ────────────────────────────────────────────────────
+"""
+Simulateur d'automates WAGO (serveur OPC UA freeopcua) pour tests et bench.
+─ expose les mêmes NodeIds que le PLC (GVL_OPCUA.*, ns=2;s=State)
+─ latence injectée sur chaque Read / Write (`latency`, secondes)
+─ pannes injectées : une fraction `fail_rate` des Read / Write renvoie
+  BadCommunicationError
+
+    python3 sim_opcua.py --ilots 3 --base-port 4841 --latency 0.005
+    → OPCUA_LGN01=opc.tcp://127.0.0.1:4841 … à placer dans le .env
+"""
+
+from __future__ import annotations
+import random
+import time
+
+from opcua import Server, ua
+
+_PREFIX = "|var|WAGO 750-8212 PFC200 G2 2ETH RS.Application.GVL_OPCUA."
+
+# (namespace, identifiant, valeur initiale, type) – cf. NODE_* de opcua_client
+TAGS = [
+    (4, _PREFIX + "REF_OF",       0,     ua.VariantType.Int32),
+    (4, _PREFIX + "Code_Produit", 0,     ua.VariantType.UInt16),
+    (4, _PREFIX + "QTS",          0,     ua.VariantType.Int32),
+    (4, _PREFIX + "Mode_IHM",     0,     ua.VariantType.UInt16),
+    (4, _PREFIX + "BP_Vld_OF_P4", False, ua.VariantType.Boolean),
+    (2, "State",                  1,     ua.VariantType.Int32),     # 1 = RUN
+]
+
+
+def _bad_value() -> ua.DataValue:
+    dv = ua.DataValue()
+    dv.StatusCode = ua.StatusCode(ua.StatusCodes.BadCommunicationError)
+    return dv
+
+
+class SimPLC:
+    def __init__(self, port: int, latency: float = 0.0, fail_rate: float = 0.0,
+                 name: str = "LGN") -> None:
+        self.url = f"opc.tcp://127.0.0.1:{port}"
+        self.latency, self.fail_rate = latency, fail_rate
+        self.server = Server()
+        self.server.set_endpoint(f"opc.tcp://0.0.0.0:{port}")
+        self.server.set_server_name(f"Simulateur {name}")
+        while len(self.server.get_namespace_array()) <= 4:        # ns=2 … ns=4
+            self.server.register_namespace(f"urn:nee:sim:{len(self.server.get_namespace_array())}")
+        objects = self.server.get_objects_node()
+        self.nodes = {}
+        for ns, ident, value, vtype in TAGS:
+            var = objects.add_variable(ua.NodeId(ident, ns), f"{ns}:{ident.rsplit('.', 1)[-1]}",
+                                       ua.Variant(value, vtype))
+            var.set_writable()
+            self.nodes[f"ns={ns};s={ident}"] = var
+        self._patch(self.server.iserver.attribute_service)
+
+    def _patch(self, service) -> None:
+        read, write = service.read, service.write
+
+        def slow_read(params, *args, **kw):
+            self._delay()
+            if self._fails():
+                return [_bad_value() for _ in params.NodesToRead]
+            return read(params, *args, **kw)
+
+        def slow_write(params, *args, **kw):
+            self._delay()
+            if self._fails():
+                return [ua.StatusCode(ua.StatusCodes.BadCommunicationError)
+                        for _ in params.NodesToWrite]
+            return write(params, *args, **kw)
+
+        service.read, service.write = slow_read, slow_write
+
+    def _delay(self) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _fails(self) -> bool:
+        return self.fail_rate > 0 and random.random() < self.fail_rate
+
+    def start(self) -> "SimPLC":
+        self.server.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    p.add_argument("--ilots", type=int, default=3)
+    p.add_argument("--base-port", type=int, default=4841)
+    p.add_argument("--latency", type=float, default=0.0, help="s par Read/Write")
+    p.add_argument("--fail-rate", type=float, default=0.0, help="0..1")
+    a = p.parse_args()
+
+    plcs = [SimPLC(a.base_port + i, a.latency, a.fail_rate, f"LGN0{i + 1}").start()
+            for i in range(a.ilots)]
+    for i, plc in enumerate(plcs):
+        print(f"OPCUA_LGN0{i + 1}={plc.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for plc in plcs:
+            plc.stop()
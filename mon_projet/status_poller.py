@@ -0,0 +1,85 @@
+# status_poller.py ────────────────────────────────────────────────
+"""
+Collecte en tâche de fond de l'état des îlots (process API).
+─ un seul thread interroge les PLC toutes les `interval` secondes
+─ /api/status lit l'instantané en mémoire : aucune I/O OPC UA sur la requête
+─ si OPCUA_SUBSCRIBE : les changements de NODE_STATE_MACHINE notifiés par
+  abonnement mettent l'instantané à jour sans attendre le prochain cycle
+"""
+
+from __future__ import annotations
+import threading
+import time
+from typing import Callable
+
+from config import STATUS_POLL_INTERVAL, OPCUA_SUBSCRIBE
+from opcua_client import (
+    get_states, bus, subscriptions, DataChange,
+    OPCUA_ENDPOINTS, NODE_STATE_MACHINE, STATE_LABELS, SHADOW_NODES,
+)
+
+
+class StatusPoller:
+    def __init__(self, interval: float = STATUS_POLL_INTERVAL,
+                 probe: Callable[[], dict[str, str]] = get_states,
+                 subscribe: bool = OPCUA_SUBSCRIBE) -> None:
+        self.interval = interval
+        self.subscribe = subscribe
+        self._probe = probe
+        self._states: dict[str, tuple[str, float]] = {}   # ilot -> (état, horodatage)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="status-poller",
+                                        daemon=True)
+        self._thread.start()
+        if self.subscribe:
+            bus.subscribe(self._on_change, node_id=NODE_STATE_MACHINE)
+            for ilot in OPCUA_ENDPOINTS:
+                subscriptions.watch(ilot, [NODE_STATE_MACHINE, *SHADOW_NODES])
+            subscriptions.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.subscribe:
+            bus.unsubscribe(self._on_change)
+
+    def refresh(self) -> None:
+        states = self._probe()
+        now = time.time()
+        with self._lock:
+            for ilot, etat in states.items():
+                self._states[ilot] = (etat, now)
+
+    def _on_change(self, evt: DataChange) -> None:
+        with self._lock:
+            self._states[evt.ilot] = (STATE_LABELS.get(evt.value, str(evt.value)),
+                                      evt.timestamp)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[STATUS] collecte KO : {e}")
+            self._stop.wait(self.interval)
+
+    def snapshot(self) -> list[dict]:
+        """[{ilot, etat, updated, age}] – `age` = ancienneté en secondes."""
+        now = time.time()
+        with self._lock:
+            items = sorted(self._states.items())
+        return [{
+            "ilot":    ilot,
+            "etat":    etat,
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)),
+            "age":     round(now - ts, 1),
+        } for ilot, (etat, ts) in items]
+
+
+poller = StatusPoller()
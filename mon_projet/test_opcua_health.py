@@ -0,0 +1,81 @@
+# test_opcua_health.py ─────────────────────────────────────────────────────────
+# Disjoncteur par endpoint : closed → open → half_open → closed / open
+# (client OPC UA remplacé par un faux : aucun PLC nécessaire)
+# -----------------------------------------------------------------------------
+import time
+
+import pytest
+
+import opcua_client as oc
+
+URL = "opc.tcp://plc-test:4840"
+
+
+class FakeClient:
+    up = False
+
+    def __init__(self, url, timeout=None):
+        self.url = url
+
+    def connect(self):
+        if not FakeClient.up:
+            raise ConnectionRefusedError("PLC hors ligne")
+
+    def disconnect(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(oc, "Client", FakeClient)
+    FakeClient.up = False
+    registry = oc.HealthRegistry(failures=3, backoff=0.05, max_backoff=0.2)
+    p = oc.SessionPool(keepalive=3600, registry=registry)
+    yield p
+    p.close_all()
+
+
+def _state(p):
+    return p.health.snapshot()[URL]["state"]
+
+
+def _trip(p):
+    for _ in range(3):
+        with pytest.raises(ConnectionRefusedError):
+            p.acquire(URL)
+    assert _state(p) == "open"
+
+
+def test_open_half_open_closed(pool):
+    _trip(pool)
+    with pytest.raises(oc.CircuitOpenError):
+        pool.acquire(URL)                   # échec immédiat, pas de connect()
+
+    FakeClient.up = True
+    time.sleep(0.06)
+    sess = pool.acquire(URL)                # la sonde se connecte vraiment
+    assert _state(pool) == "half_open"
+    with pytest.raises(oc.CircuitOpenError):
+        pool.acquire(URL)                   # une seule sonde à la fois
+    pool.release(sess)
+    assert _state(pool) == "closed"
+
+    sess = pool.acquire(URL)
+    pool.release(sess)
+    assert pool.health.snapshot()[URL]["failures"] == 0
+
+
+def test_failed_probe_reopens_with_longer_backoff(pool):
+    _trip(pool)
+    time.sleep(0.06)
+    with pytest.raises(ConnectionRefusedError):
+        pool.acquire(URL)                   # sonde en échec
+    snap = pool.health.snapshot()[URL]
+    assert snap["state"] == "open"
+    assert snap["retry_in"] > 0.05          # délai doublé
+
+    FakeClient.up = True
+    time.sleep(0.11)
+    with oc.OPCUAHandler(URL, pool=pool):
+        pass
+    assert _state(pool) == "closed"
@@ -0,0 +1,116 @@
+# traceability.py ─────────────────────────────────────────────────
+"""
+Journal de traçabilité des envois vers les automates (SQLite, mode WAL).
+─ un événement par send_order_details / pulse_bit / push_user :
+  horodatage, action, OF, îlot, rôle utilisateur, latence, résultat
+─ index (of, ts), (ilot, ts), (ts) + tri et pagination sur (ts, id) :
+  l'index donne directement l'ordre (pas de tri des lignes trouvées)
+  ⇒ requêtes rapides même après des mois d'historique
+─ WAL : l'IHM et l'API peuvent écrire / lire la même base simultanément ;
+  TRACE_DIR (chemin absolu) = même dossier pour l'IHM sur l'hôte et pour
+  l'API, où docker-compose le monte au même chemin
+"""
+
+from __future__ import annotations
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()           # importé avant opcua_client (qui charge aussi .env)
+
+TRACE_DIR = os.getenv("TRACE_DIR", "")
+TRACE_DB = os.getenv("TRACE_DB") or str(
+    Path(TRACE_DIR) / "traceability.db" if TRACE_DIR else Path(__file__).with_name("traceability.db"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id         INTEGER PRIMARY KEY,
+    ts         REAL    NOT NULL,
+    action     TEXT    NOT NULL,
+    of         TEXT,
+    ilot       TEXT,
+    role       INTEGER,
+    latency_ms REAL,
+    ok         INTEGER NOT NULL,
+    detail     TEXT
+);
+CREATE INDEX IF NOT EXISTS events_of_ts   ON events (of, ts);
+CREATE INDEX IF NOT EXISTS events_ilot_ts ON events (ilot, ts);
+CREATE INDEX IF NOT EXISTS events_ts      ON events (ts);
+"""
+
+_COLUMNS = ("id", "ts", "action", "of", "ilot", "role", "latency_ms", "ok", "detail")
+
+
+class TraceStore:
+    def __init__(self, path: str = TRACE_DB) -> None:
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # appelé verrou pris ; ouverture paresseuse (pas de fichier créé à l'import)
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def record(self, action: str, ilot: str | None = None, of: str | None = None,
+               role: int | None = None, latency_ms: float | None = None,
+               ok: bool = True, detail: str | None = None) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO events (ts, action, of, ilot, role, latency_ms, ok, detail)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), action, of, ilot, role, latency_ms, int(ok), detail))
+            db.commit()
+
+    def query(self, of: str | None = None, ilot: str | None = None,
+              since: float | None = None, until: float | None = None,
+              cursor: int | None = None, limit: int = 100) -> dict:
+        """
+        Événements du plus récent au plus ancien.
+        Retourne {"events": [...], "next_cursor"} ; next_cursor = None en fin.
+        `cursor` = id du dernier événement de la page précédente.
+        """
+        where, args = [], []
+        for cond, value in (("of = ?", of), ("ilot = ?", ilot), ("ts >= ?", since),
+                            ("ts <= ?", until)):
+            if value is not None:
+                where.append(cond); args.append(value)
+        with self._lock:
+            db = self._db()
+            if cursor is not None:
+                row = db.execute("SELECT ts FROM events WHERE id = ?", (cursor,)).fetchone()
+                if row is not None:
+                    where.append("(ts, id) < (?, ?)"); args += [row[0], cursor]
+                else:
+                    where.append("id < ?"); args.append(cursor)
+            sql = (f"SELECT {', '.join(_COLUMNS)} FROM events"
+                   f"{' WHERE ' + ' AND '.join(where) if where else ''}"
+                   " ORDER BY ts DESC, id DESC LIMIT ?")
+            rows = db.execute(sql, (*args, limit + 1)).fetchall()
+        more, rows = len(rows) > limit, rows[:limit]
+        events = [dict(zip(_COLUMNS, r)) for r in rows]
+        for e in events:
+            e["ok"] = bool(e["ok"])
+        return {"events": events, "next_cursor": events[-1]["id"] if more else None}
+
+
+store = TraceStore()
+
+
+def record(action: str, **fields) -> None:
+    """Enregistre sans jamais faire échouer l'opération tracée."""
+    try:
+        store.record(action, **fields)
+    except Exception as e:
+        print(f"[TRACE] enregistrement KO : {e}")